@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import numpy as np
+import requests
+import main_chatbot
+from concurrent.futures import ThreadPoolExecutor
+from main_chatbot import DB_NAME, TABLE_NAME, EmbeddingBatcher, EmbeddingService
+
+# =========================
+# CONFIG
+# =========================
+# (mode quantization, dimensi coarse pass)
+INDEX_CONFIGS = [
+    ("float32", 1536),
+    ("float16", 1536),
+    ("int8", 1536),
+    ("float32", 256),
+    ("int8", 256),
+]
+NUM_QUERIES = 200
+TOP_K = 3
+QUERY_NOISE = 0.05
+
+# Data sintetis jika knowledge_base.db belum tersedia
+SYNTHETIC_CHUNKS = 5000
+SYNTHETIC_TOPICS = 50
+SYNTHETIC_DIMENSIONS = 1536
+
+# Benchmark micro-batching terhadap fake_openai_server.py
+FAKE_SERVER_URL = "http://127.0.0.1:8001"
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+REQUESTS_PER_LEVEL = 256
+
+# Benchmark tail latency (jalankan server dengan FAKE_SLOW_RATE / FAKE_ERROR_RATE)
+RESILIENCE_REQUESTS = 300
+RESILIENCE_CONCURRENCY = 8
+
+# =========================
+# DATA
+# =========================
+def build_synthetic_db(path):
+    """Membuat database sintetis berisi vektor yang mengelompok per topik"""
+    rng = np.random.default_rng(0)
+    topics = rng.normal(size=(SYNTHETIC_TOPICS, SYNTHETIC_DIMENSIONS))
+    labels = rng.integers(0, SYNTHETIC_TOPICS, SYNTHETIC_CHUNKS)
+    vectors = topics[labels] + rng.normal(scale=0.8, size=(SYNTHETIC_CHUNKS, SYNTHETIC_DIMENSIONS))
+
+    # Seperti embedding Matryoshka, informasi terkonsentrasi di dimensi awal
+    vectors *= 1.0 / np.sqrt(1.0 + np.arange(SYNTHETIC_DIMENSIONS) / 64.0)
+
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conv_id TEXT,
+        chunk_index INTEGER,
+        bubble_count INTEGER,
+        text TEXT,
+        vector TEXT,
+        priority INTEGER DEFAULT 0,
+        UNIQUE(conv_id, chunk_index)
+    )
+    """)
+
+    cursor.executemany(f"""
+    INSERT INTO {TABLE_NAME} (conv_id, chunk_index, bubble_count, text, vector)
+    VALUES (?, ?, ?, ?, ?)
+    """, [
+        (f"synthetic-{i}", 0, 1, f"Chunk sintetis {i}", json.dumps(vector.tolist()))
+        for i, vector in enumerate(vectors)
+    ])
+
+    conn.commit()
+    conn.close()
+
+def load_raw_vectors(db_path):
+    """Membaca semua vektor presisi penuh sebagai ground truth"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(f"SELECT id, vector FROM {TABLE_NAME} ORDER BY id")
+    rows = cursor.fetchall()
+
+    conn.close()
+
+    ids = np.array([row_id for row_id, _ in rows])
+    vectors = np.array([json.loads(vector) for _, vector in rows], dtype=np.float64)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return ids, vectors
+
+def make_queries(vectors):
+    """Membuat query dari vektor yang ada ditambah noise"""
+    rng = np.random.default_rng(1)
+    picked = vectors[rng.integers(0, len(vectors), NUM_QUERIES)]
+    noise = rng.normal(scale=QUERY_NOISE, size=picked.shape)
+    return picked + noise
+
+# =========================
+# BENCHMARK
+# =========================
+def run_index_benchmark(db_path):
+    """Membandingkan memori, latency, dan recall@3 untuk setiap konfigurasi index"""
+    ids, vectors = load_raw_vectors(db_path)
+    queries = make_queries(vectors)
+
+    # Ground truth: pencarian exact dengan float64
+    queries_normalized = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = np.argsort(-(queries_normalized @ vectors.T), axis=1)[:, :TOP_K]
+    exact_ids = [set(ids[row]) for row in exact]
+
+    print(f"Jumlah chunk: {len(ids)}, dimensi: {vectors.shape[1]}, query: {len(queries)}")
+    print(f"{'mode':<10}{'coarse':>8}{'memori (MB)':>14}{'p50 (ms)':>12}{'p95 (ms)':>12}{'recall@3':>12}")
+
+    for mode, coarse_dimensions in INDEX_CONFIGS:
+        service = EmbeddingService()
+        service.similarity_threshold = -1.0
+        service.dimensions = vectors.shape[1]
+        service.coarse_dimensions = min(coarse_dimensions, vectors.shape[1])
+        service.load_embeddings(db_path, TABLE_NAME, quantization=mode)
+
+        # Hot tier dimatikan: dengan threshold -1 setiap query akan berhenti di hot tier
+        service.index.hot_rows = None
+
+        latencies = []
+        hits = 0
+
+        for query, expected in zip(queries, exact_ids):
+            start = time.perf_counter()
+            results, _ = service.search_by_vector(query, top_k=TOP_K)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            hits += len(expected & {item["id"] for item, _ in results})
+
+        recall = hits / (len(queries) * TOP_K)
+        memory_mb = service.memory_usage() / (1024 * 1024)
+
+        print(
+            f"{mode:<10}{service.coarse_dimensions:>8}{memory_mb:>14.2f}{np.percentile(latencies, 50):>12.2f}"
+            f"{np.percentile(latencies, 95):>12.2f}{recall:>12.3f}"
+        )
+
+def run_batching_benchmark():
+    """Membandingkan throughput embedding query dengan dan tanpa micro-batching"""
+    os.environ.setdefault("OPENAI_BASE_URL", f"{FAKE_SERVER_URL}/v1")
+
+    print(f"Server: {os.environ['OPENAI_BASE_URL']}, request per level: {REQUESTS_PER_LEVEL}")
+    print(f"{'batching':<10}{'concurrency':>12}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'API calls':>12}")
+
+    for batching in (False, True):
+        for concurrency in CONCURRENCY_LEVELS:
+            service = EmbeddingService()
+            service.batcher = EmbeddingBatcher(service.create_embeddings) if batching else None
+
+            requests.delete(f"{FAKE_SERVER_URL}/stats")
+            latencies = []
+
+            def embed_one(i):
+                start = time.perf_counter()
+                service.get_embedding(f"Halo, saya mau tanya harga paket {i}")
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(embed_one, range(REQUESTS_PER_LEVEL)))
+            elapsed = time.perf_counter() - start
+
+            calls = requests.get(f"{FAKE_SERVER_URL}/stats").json()["embedding_requests"]
+
+            print(
+                f"{str(batching):<10}{concurrency:>12}{REQUESTS_PER_LEVEL / elapsed:>10.1f}"
+                f"{np.percentile(latencies, 50):>12.1f}{np.percentile(latencies, 95):>12.1f}{calls:>12}"
+            )
+
+def run_resilience_benchmark():
+    """Membandingkan tail latency embedding query dengan dan tanpa hedged request"""
+    os.environ.setdefault("OPENAI_BASE_URL", f"{FAKE_SERVER_URL}/v1")
+    hedge_delay = main_chatbot.EMBEDDING_HEDGE_DELAY
+
+    print(f"Server: {os.environ['OPENAI_BASE_URL']}, request: {RESILIENCE_REQUESTS}")
+    print(f"{'hedging':<10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'max (ms)':>10}{'gagal':>8}{'API calls':>12}")
+
+    for hedging in (False, True):
+        main_chatbot.EMBEDDING_HEDGE_DELAY = hedge_delay if hedging else None
+
+        service = EmbeddingService()
+        service.batcher = None
+
+        requests.delete(f"{FAKE_SERVER_URL}/stats")
+        latencies = []
+        failures = []
+
+        def embed_one(i):
+            start = time.perf_counter()
+            try:
+                service.get_embedding(f"Berapa harga paket website {i}")
+            except Exception as e:
+                failures.append(e)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        with ThreadPoolExecutor(max_workers=RESILIENCE_CONCURRENCY) as executor:
+            list(executor.map(embed_one, range(RESILIENCE_REQUESTS)))
+
+        calls = requests.get(f"{FAKE_SERVER_URL}/stats").json()["embedding_requests"]
+
+        print(
+            f"{str(hedging):<10}{np.percentile(latencies, 50):>10.0f}{np.percentile(latencies, 95):>10.0f}"
+            f"{np.percentile(latencies, 99):>10.0f}{max(latencies):>10.0f}{len(failures):>8}{calls:>12}"
+        )
+
+    main_chatbot.EMBEDDING_HEDGE_DELAY = hedge_delay
+
+# =========================
+# RUN
+# =========================
+# python benchmark.py [index|batching|resilience] [db_path]
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "index"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DB_NAME
+
+    if command == "batching":
+        run_batching_benchmark()
+    elif command == "resilience":
+        run_resilience_benchmark()
+    elif os.path.exists(db_path):
+        run_index_benchmark(db_path)
+    else:
+        print(f"Database {db_path} tidak ditemukan, memakai data sintetis.")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            synthetic_path = os.path.join(tmp_dir, "benchmark.db")
+            build_synthetic_db(synthetic_path)
+            run_index_benchmark(synthetic_path)
@@ -21,139 +21,196 @@ TABLE_NAME = "conversation_embeddings"
 
 BUBBLE_PER_CHUNK = 5
 EMBED_MODEL = "text-embedding-3-small"
+METADATA_TABLE = "index_metadata"
+
+# Dimensi embedding (harus sama dengan EMBEDDING_DIMENSIONS di main_chatbot.py)
+EMBED_DIMENSIONS = 1536
 
 # Jumlah chunk per request API
 BATCH_SIZE = 100  
 
 # =========================
-# CONNECT TO SQLITE
+# BUBBLING + CHUNKING
 # =========================
-conn = sqlite3.connect(DB_NAME)
-cursor = conn.cursor()
+def build_chunks(data, bubble_per_chunk=BUBBLE_PER_CHUNK):
+    """Memecah setiap sesi percakapan menjadi chunk berisi beberapa bubble"""
+    all_chunks = []
 
-# =========================
-# CREATE TABLE
-# =========================
-cursor.execute(f"""
-CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    conv_id TEXT,
-    chunk_index INTEGER,
-    bubble_count INTEGER,
-    text TEXT,
-    vector TEXT,
-    priority INTEGER DEFAULT 0,
-    UNIQUE(conv_id, chunk_index)
-)
-""")
+    for conv_id, sessions in data.items():
+        chunk_id = 0
 
-# =========================
-# SEARCH INDEX
-# =========================
-cursor.execute(f"""
-CREATE INDEX IF NOT EXISTS idx_conv_id
-ON {TABLE_NAME}(conv_id, chunk_index)
-""")
+        for session_index, session in enumerate(sessions):
+            bubbles = []
 
-conn.commit()
+            for msg in session:
+                role = msg.get("role", "").lower()
+                text = msg.get("text", "").strip()
 
-# =========================
-# LOAD DATA
-# =========================
-if not os.path.exists(INPUT_FILE):
-    print(f"File {INPUT_FILE} tidak ditemukan.")
-    exit()
+                if not text:
+                    continue
 
-with open(INPUT_FILE, "r", encoding="utf-8") as f:
-    data = json.load(f)
+                formatted_text = f"{role.title()}:\n{text}"
+                bubbles.append(formatted_text)
 
-# =========================
-# BUBBLING + CHUNKING
-# =========================
-all_chunks = []
-new_conv_ids = set()
+            # Skip session yang hanya 1 bubble
+            if len(bubbles) <= 1:
+                continue
 
-for conv_id, sessions in data.items():
-    chunk_id = 0
-    new_conv_ids.add(conv_id)
+            for i in range(0, len(bubbles), bubble_per_chunk):
+                chunk = bubbles[i:i+bubble_per_chunk]
 
-    for session_index, session in enumerate(sessions):
-        bubbles = []
+                # Jika sisa 1 percakapan maka digabung ke chunk sebelumnya
+                if len(chunk) == 1 and all_chunks:
+                    all_chunks[-1]["text"] += "\n" + chunk[0]
+                    all_chunks[-1]["bubble_count"] += 1
+                    continue
 
-        for msg in session:
-            role = msg.get("role", "").lower()
-            text = msg.get("text", "").strip()
+                chunk_text = "\n".join(chunk)
 
-            if not text:
-                continue
+                all_chunks.append({
+                    "conv_id": conv_id,
+                    "chunk_index": chunk_id,
+                    "bubble_count": len(chunk),
+                    "text": chunk_text
+                })
 
-            formatted_text = f"{role.title()}:\n{text}"
-            bubbles.append(formatted_text)
+                chunk_id += 1
 
-        # Skip session yang hanya 1 bubble
-        if len(bubbles) <= 1:
-            continue
+    return all_chunks
 
-        for i in range(0, len(bubbles), BUBBLE_PER_CHUNK):
-            chunk = bubbles[i:i+BUBBLE_PER_CHUNK]
+# =========================
+# MAIN PROCESS
+# =========================
+def run_bubbling():
+    """Membuat chunk dari percakapan lalu menyimpan embedding ke SQLite"""
+    # =========================
+    # CONNECT TO SQLITE
+    # =========================
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
 
-            # Jika sisa 1 percakapan maka digabung ke chunk sebelumnya
-            if len(chunk) == 1 and all_chunks:
-                all_chunks[-1]["text"] += "\n" + chunk[0]
-                all_chunks[-1]["bubble_count"] += 1
-                continue
+    # =========================
+    # CREATE TABLE
+    # =========================
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conv_id TEXT,
+        chunk_index INTEGER,
+        bubble_count INTEGER,
+        text TEXT,
+        vector TEXT,
+        priority INTEGER DEFAULT 0,
+        UNIQUE(conv_id, chunk_index)
+    )
+    """)
 
-            chunk_text = "\n".join(chunk)
+    # =========================
+    # SEARCH INDEX
+    # =========================
+    cursor.execute(f"""
+    CREATE INDEX IF NOT EXISTS idx_conv_id
+    ON {TABLE_NAME}(conv_id, chunk_index)
+    """)
 
-            all_chunks.append({
-                "conv_id": conv_id,
-                "chunk_index": chunk_id,
-                "bubble_count": len(chunk),
-                "text": chunk_text
-            })
+    # =========================
+    # INDEX METADATA
+    # =========================
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+
+    cursor.execute(f"SELECT key, value FROM {METADATA_TABLE}")
+    metadata = dict(cursor.fetchall())
+
+    # Vektor lama dengan model/dimensi berbeda tidak boleh dicampur
+    if metadata and (
+        metadata.get("embed_model") != EMBED_MODEL
+        or int(metadata.get("dimensions", 0)) != EMBED_DIMENSIONS
+    ):
+        print(
+            f"Database {DB_NAME} berisi embedding {metadata.get('embed_model')} "
+            f"{metadata.get('dimensions')} dimensi, tidak sama dengan konfigurasi "
+            f"{EMBED_MODEL} {EMBED_DIMENSIONS} dimensi."
+        )
+        return
+
+    cursor.executemany(f"""
+    INSERT OR REPLACE INTO {METADATA_TABLE} (key, value) VALUES (?, ?)
+    """, [
+        ("embed_model", EMBED_MODEL),
+        ("dimensions", str(EMBED_DIMENSIONS))
+    ])
 
-            chunk_id += 1
+    conn.commit()
 
-# =========================
-# BATCH EMBEDDING
-# =========================
-for i in range(0, len(all_chunks), BATCH_SIZE):
-    batch = all_chunks[i:i+BATCH_SIZE]
-    batch_texts = [item["text"] for item in batch]
+    # =========================
+    # LOAD DATA
+    # =========================
+    if not os.path.exists(INPUT_FILE):
+        print(f"File {INPUT_FILE} tidak ditemukan.")
+        return
 
-    print(f"Embedding batch {i//BATCH_SIZE + 1}...")
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
 
-    response = client.embeddings.create(
-        model = EMBED_MODEL,
-        input = batch_texts
-    )
+    all_chunks = build_chunks(data)
 
-    embeddings = [item.embedding for item in response.data]
+    # =========================
+    # BATCH EMBEDDING
+    # =========================
+    for i in range(0, len(all_chunks), BATCH_SIZE):
+        batch = all_chunks[i:i+BATCH_SIZE]
+        batch_texts = [item["text"] for item in batch]
+
+        print(f"Embedding batch {i//BATCH_SIZE + 1}...")
+
+        response = client.embeddings.create(
+            model = EMBED_MODEL,
+            input = batch_texts,
+            dimensions = EMBED_DIMENSIONS
+        )
+
+        embeddings = [item.embedding for item in response.data]
+
+        # =========================
+        # INSERT TO SQLITE
+        # =========================
+        for chunk_data, vector in zip(batch, embeddings):
+            vector_json = json.dumps(vector)
+
+            # Upsert agar priority yang sudah di-set tidak ter-reset
+            cursor.execute(f"""
+            INSERT INTO {TABLE_NAME}
+            (conv_id, chunk_index, bubble_count, text, vector)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(conv_id, chunk_index) DO UPDATE SET
+                bubble_count = excluded.bubble_count,
+                text = excluded.text,
+                vector = excluded.vector
+            """, (
+                chunk_data["conv_id"],
+                chunk_data["chunk_index"],
+                chunk_data["bubble_count"],
+                chunk_data["text"],
+                vector_json
+            ))
+
+        conn.commit()
 
     # =========================
-    # INSERT TO SQLITE
+    # CLOSE DATABASE
     # =========================
-    for chunk_data, vector in zip(batch, embeddings):
-        vector_json = json.dumps(vector)
-
-        cursor.execute(f"""
-        INSERT OR REPLACE INTO {TABLE_NAME}
-        (conv_id, chunk_index, bubble_count, text, vector)
-        VALUES (?, ?, ?, ?, ?)
-        """, (
-            chunk_data["conv_id"],
-            chunk_data["chunk_index"],
-            chunk_data["bubble_count"],
-            chunk_data["text"],
-            vector_json
-        ))
+    conn.close()
 
-    conn.commit()
+    print("Selesai.")
+    print(f"Disimpan di database {DB_NAME} tabel {TABLE_NAME}")
 
 # =========================
-# CLOSE DATABASE
+# RUN
 # =========================
-conn.close()
-
-print("Selesai.")
-print(f"Disimpan di database {DB_NAME} tabel {TABLE_NAME}")
\ No newline at end of file
+if __name__ == "__main__":
+    run_bubbling()
@@ -0,0 +1,15 @@
+from main_chatbot import DB_NAME, TABLE_NAME, INDEX_DIR, EmbeddingService
+
+# =========================
+# BUILD SHARED INDEX
+# =========================
+# Jalankan sekali sebelum menyalakan worker API (INDEX_MODE = "shared").
+# Menjalankan ulang script ini membuat generation baru, dan setiap worker
+# akan memuat ulang index secara otomatis (hot reload).
+# Tidak membutuhkan OPENAI_API_KEY karena hanya membaca vektor dari database.
+if __name__ == "__main__":
+    service = EmbeddingService()
+    generation = service.publish_index(DB_NAME, TABLE_NAME, INDEX_DIR)
+
+    print("Selesai.")
+    print(f"Index generation {generation} disimpan di folder {INDEX_DIR}")
@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import numpy as np
+from bubbling import INPUT_FILE, BATCH_SIZE, build_chunks
+from main_chatbot import (
+    RERANK_CANDIDATES,
+    TABLE_NAME,
+    EmbeddingService,
+    build_vector_index,
+    normalize_rows,
+    quantize_matrix,
+    score_matrix
+)
+
+# =========================
+# CONFIG
+# =========================
+CACHE_FILE = "evaluation_cache.npz"
+
+# Konfigurasi index yang dibandingkan
+CHUNK_SIZES = [3, 5, 8]
+THRESHOLDS = [0.3, 0.4, 0.5, 0.6]
+
+# (nama, mode quantization, dimensi coarse pass); None = dimensi penuh
+SEARCH_CONFIGS = [
+    ("exact", "float32", None),
+    ("int8", "int8", None),
+    ("coarse256", "float32", 256),
+    ("int8+coarse256", "int8", 256),
+]
+
+RECALL_KS = [1, 3, 5]
+MRR_DEPTH = 10
+
+# Jumlah query yang diukur latency-nya satu per satu
+LATENCY_SAMPLE = 200
+
+# =========================
+# QUERY / ANSWER PAIRS
+# =========================
+def build_pairs(data):
+    """Memasangkan setiap bubble user dengan bubble assistant yang mengikutinya"""
+    pairs = []
+
+    for conv_id, sessions in data.items():
+        for session in sessions:
+            messages = [
+                (msg.get("role", "").lower(), msg.get("text", "").strip())
+                for msg in session
+            ]
+            messages = [(role, text) for role, text in messages if text]
+
+            for (role, text), (next_role, next_text) in zip(messages, messages[1:]):
+                if role == "user" and next_role in ("assistant", "agent"):
+                    pairs.append({
+                        "conv_id": conv_id,
+                        "query": text,
+                        "answer": next_text
+                    })
+
+    return pairs
+
+def mask_query_bubble(chunk_text, query):
+    """Menghapus bubble user yang identik dengan query dari teks chunk (format "Role:\nteks")"""
+    bubbles = []
+
+    for line in chunk_text.split("\n"):
+        if line in ("User:", "Assistant:", "Agent:"):
+            bubbles.append([line])
+        elif bubbles:
+            bubbles[-1].append(line)
+
+    kept = [
+        bubble for bubble in bubbles
+        if not (bubble[0] == "User:" and "\n".join(bubble[1:]) == query)
+    ]
+    return "\n".join("\n".join(bubble) for bubble in kept)
+
+# =========================
+# EMBEDDING CACHE
+# =========================
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def load_cache():
+    if not os.path.exists(CACHE_FILE):
+        return {}
+
+    cache = np.load(CACHE_FILE)
+    return {key: cache[key] for key in cache.files}
+
+def embed_texts(service, texts, cache):
+    """Embedding teks secara batch, memakai cache agar evaluasi ulang tidak memanggil API lagi"""
+    missing = list(dict.fromkeys(text for text in texts if text_key(text) not in cache))
+
+    for i in range(0, len(missing), BATCH_SIZE):
+        batch = missing[i:i+BATCH_SIZE]
+        print(f"Embedding batch {i//BATCH_SIZE + 1} dari {(len(missing) - 1)//BATCH_SIZE + 1}...")
+
+        for text, vector in zip(batch, service.create_embeddings(batch)):
+            cache[text_key(text)] = np.asarray(vector, dtype=np.float32)
+
+    if missing:
+        np.savez(CACHE_FILE, **cache)
+
+    return np.vstack([cache[text_key(text)] for text in texts])
+
+# =========================
+# PRODUCTION INDEX
+# =========================
+def write_database(db_path, entries, matrix):
+    """Menyimpan chunk ke SQLite dengan format tabel produksi agar re-rank membaca dari database"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(f"CREATE TABLE {TABLE_NAME} (id INTEGER PRIMARY KEY, text TEXT, vector TEXT)")
+    cursor.executemany(
+        f"INSERT INTO {TABLE_NAME} (id, text, vector) VALUES (?, ?, ?)",
+        [(entry["id"], entry["text"], json.dumps(vector.tolist())) for entry, vector in zip(entries, matrix)]
+    )
+
+    conn.commit()
+    conn.close()
+
+# =========================
+# METRICS
+# =========================
+def rank_with_masking(service, index, queries, own_chunks, masked_vectors):
+    """Ranking seperti search_by_vectors, tetapi chunk milik query diganti versi tanpa bubble query.
+    Versi tanpa bubble melewati first-pass yang sama (prefix coarse dan quantization index)
+    dan hanya masuk shortlist jika skornya mengalahkan kandidat lain."""
+    entries = index.entries
+    coarse_queries = normalize_rows(queries[:, :index.coarse_dimensions])
+    full_queries = normalize_rows(queries)
+    first_pass = score_matrix(index.matrix, index.scales, coarse_queries).T
+
+    # Vektor tanpa bubble dikompakkan dengan skala index agar skornya sebanding
+    masked_compact, _ = quantize_matrix(
+        normalize_rows(masked_vectors[:, :index.coarse_dimensions]), index.quantization, index.scales
+    )
+
+    candidates = max(MRR_DEPTH, RERANK_CANDIDATES) if index.needs_rerank else MRR_DEPTH
+    candidates = min(candidates, len(entries))
+
+    shortlists = []
+    position = 0
+
+    for row, masked in enumerate(own_chunks):
+        own_ids = np.array(list(masked), dtype=np.int64)
+        masked_rows = np.arange(position, position + len(own_ids))
+        position += len(own_ids)
+
+        # Chunk asli milik query dikeluarkan, versi tanpa bubble ikut bersaing di first-pass
+        scores = first_pass[row].copy()
+        scores[own_ids] = -np.inf
+        masked_scores = score_matrix(masked_compact[masked_rows], index.scales, coarse_queries[row])
+
+        combined = np.concatenate([scores, masked_scores])
+        best = np.argpartition(-combined, candidates - 1)[:candidates]
+
+        is_original = best < len(entries)
+        chunk_ids = np.concatenate([np.arange(len(entries)), own_ids])[best]
+        masked_index = masked_rows[best[~is_original] - len(entries)]
+
+        shortlists.append((is_original, chunk_ids, masked_index, combined[best]))
+
+    # Re-rank: baris asli memakai vektor penuh dari database seperti jalur produksi,
+    # versi tanpa bubble memakai embedding penuhnya
+    if index.needs_rerank:
+        original_rows = np.array([np.where(is_original, chunk_ids, 0) for is_original, chunk_ids, _, _ in shortlists])
+        original_vectors = service.fetch_full_vectors(index, original_rows)
+        masked_full = normalize_rows(masked_vectors)
+
+    rankings = []
+
+    for row, (is_original, chunk_ids, masked_index, scores) in enumerate(shortlists):
+        if index.needs_rerank:
+            vectors = original_vectors[row].copy()
+            vectors[~is_original] = masked_full[masked_index]
+            scores = vectors @ full_queries[row]
+
+        order = np.argsort(-scores)[:MRR_DEPTH]
+        rankings.append([(entries[chunk_ids[i]], float(scores[i])) for i in order])
+
+    return rankings
+
+def evaluate_rankings(rankings, relevant, threshold):
+    """Menghitung recall@k, MRR, dan rate "tidak ada jawaban" untuk satu threshold"""
+    hits = {k: 0 for k in RECALL_KS}
+    reciprocal_rank = 0.0
+    no_answer = 0
+
+    for ranking, targets in zip(rankings, relevant):
+        ranked_ids = [item["id"] for item, score in ranking if score >= threshold]
+
+        if not ranked_ids:
+            no_answer += 1
+            continue
+
+        for rank, chunk_id in enumerate(ranked_ids[:MRR_DEPTH], 1):
+            if chunk_id in targets:
+                reciprocal_rank += 1 / rank
+                for k in RECALL_KS:
+                    if rank <= k:
+                        hits[k] += 1
+                break
+
+    total = len(rankings)
+    return {
+        **{f"recall@{k}": hits[k] / total for k in RECALL_KS},
+        "mrr": reciprocal_rank / total,
+        "no_answer": no_answer / total
+    }
+
+# =========================
+# MAIN PROCESS
+# =========================
+def run_evaluation():
+    """Menjalankan evaluasi retrieval untuk setiap kombinasi konfigurasi index"""
+    if not os.path.exists(INPUT_FILE):
+        print(f"File {INPUT_FILE} tidak ditemukan.")
+        return
+
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    pairs = build_pairs(data)
+    service = EmbeddingService()
+    service.batcher = None
+    service.similarity_threshold = -1.0
+    cache = load_cache()
+
+    print(f"Jumlah pasangan query/jawaban: {len(pairs)}")
+    queries = embed_texts(service, [pair["query"] for pair in pairs], cache)
+
+    rows = []
+
+    # Vektor penuh untuk re-rank dibaca dari SQLite, sama seperti INDEX_MODE = "sqlite"
+    service.table_name = TABLE_NAME
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for chunk_size in CHUNK_SIZES:
+            chunks = build_chunks(data, chunk_size)
+            matrix = embed_texts(service, [chunk["text"] for chunk in chunks], cache)
+
+            entries = [
+                {"id": i, "conv_id": chunk["conv_id"], "text": chunk["text"]}
+                for i, chunk in enumerate(chunks)
+            ]
+
+            service.db_path = os.path.join(work_dir, f"chunk{chunk_size}.db")
+            write_database(service.db_path, entries, matrix)
+
+            entries_by_conv = {}
+            for entry in entries:
+                entries_by_conv.setdefault(entry["conv_id"], []).append(entry)
+
+            # Chunk relevan: chunk dari percakapan yang sama yang memuat jawaban assistant
+            relevant = [
+                {
+                    entry["id"] for entry in entries_by_conv.get(pair["conv_id"], [])
+                    if pair["answer"] in entry["text"]
+                }
+                for pair in pairs
+            ]
+
+            # Chunk yang memuat bubble query itu sendiri diskor ulang tanpa bubble tersebut,
+            # agar recall tidak hanya mengukur query yang menemukan dirinya sendiri
+            own_chunks = []
+            for pair in pairs:
+                masked = {}
+                for entry in entries_by_conv.get(pair["conv_id"], []):
+                    masked_text = mask_query_bubble(entry["text"], pair["query"])
+                    if masked_text != entry["text"]:
+                        masked[entry["id"]] = masked_text
+                own_chunks.append(masked)
+
+            masked_texts = [text for masked in own_chunks for text in masked.values()]
+            masked_vectors = (
+                embed_texts(service, masked_texts, cache) if masked_texts
+                else np.zeros((0, matrix.shape[1]), dtype=np.float32)
+            )
+
+            for name, quantization, coarse_dimensions in SEARCH_CONFIGS:
+                service.index = build_vector_index(
+                    entries, matrix, quantization,
+                    coarse_dimensions or matrix.shape[1],
+                    keep_full=False
+                )
+
+                # Semua query diskor dalam satu operasi matriks
+                start = time.perf_counter()
+                service.search_by_vectors(queries, top_k=MRR_DEPTH)
+                batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+                rankings = rank_with_masking(service, service.index, queries, own_chunks, masked_vectors)
+
+                # Latency satu query seperti di jalur /chat
+                latencies = []
+                for query in queries[:LATENCY_SAMPLE]:
+                    start = time.perf_counter()
+                    service.search_by_vector(query, top_k=MRR_DEPTH)
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+                for threshold in THRESHOLDS:
+                    rows.append({
+                        "chunk": chunk_size,
+                        "search": name,
+                        "threshold": threshold,
+                        **evaluate_rankings(rankings, relevant, threshold),
+                        "p50_ms": float(np.percentile(latencies, 50)),
+                        "batch_ms": batch_ms
+                    })
+
+    print_table(rows)
+
+def print_table(rows):
+    """Menampilkan hasil evaluasi sebagai tabel yang bisa dibandingkan"""
+    columns = ["chunk", "search", "threshold"] + [f"recall@{k}" for k in RECALL_KS] + ["mrr", "no_answer", "p50_ms", "batch_ms"]
+    widths = {column: max(len(column), 14 if column == "search" else 9) for column in columns}
+
+    print()
+    print("  ".join(column.rjust(widths[column]) for column in columns))
+
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row[column]
+            text = f"{value:.3f}" if isinstance(value, float) else str(value)
+            cells.append(text.rjust(widths[column]))
+        print("  ".join(cells))
+
+# =========================
+# RUN
+# =========================
+if __name__ == "__main__":
+    run_evaluation()
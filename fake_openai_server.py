@@ -0,0 +1,150 @@
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import numpy as np
+from flask import Flask, request, jsonify
+
+# =========================
+# CONFIG
+# =========================
+# Server tiruan OpenAI untuk benchmark lokal tanpa API key asli.
+# Jalankan lalu arahkan client dengan OPENAI_BASE_URL=http://127.0.0.1:8001/v1
+PORT = int(os.getenv("FAKE_PORT", "8001"))
+
+# Latency per request (detik) ditambah latency per input di dalam batch
+EMBED_LATENCY = float(os.getenv("FAKE_EMBED_LATENCY", "0.05"))
+EMBED_LATENCY_PER_INPUT = float(os.getenv("FAKE_EMBED_LATENCY_PER_INPUT", "0.0005"))
+CHAT_LATENCY = float(os.getenv("FAKE_CHAT_LATENCY", "0.3"))
+DEFAULT_DIMENSIONS = 1536
+
+# Simulasi tail latency dan error: sebagian request lambat atau gagal (HTTP 500)
+SLOW_RATE = float(os.getenv("FAKE_SLOW_RATE", "0"))
+SLOW_LATENCY = float(os.getenv("FAKE_SLOW_LATENCY", "2.0"))
+ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+
+app = Flask(__name__)
+
+stats_lock = threading.Lock()
+stats = {
+    "embedding_requests": 0,
+    "embedding_inputs": 0,
+    "chat_requests": 0,
+    "slow_requests": 0,
+    "failed_requests": 0
+}
+
+def inject_faults():
+    """Menambah latency lambat atau mengembalikan error sesuai konfigurasi"""
+    if random.random() < SLOW_RATE:
+        with stats_lock:
+            stats["slow_requests"] += 1
+        time.sleep(SLOW_LATENCY)
+
+    if random.random() < ERROR_RATE:
+        with stats_lock:
+            stats["failed_requests"] += 1
+        return jsonify({"error": {"message": "Fake server error", "type": "server_error"}}), 500
+
+    return None
+
+def fake_vector(text, dimensions, encoding_format):
+    """Vektor deterministik dari hash teks"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).normal(size=dimensions).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+
+    # Client openai meminta base64 secara default
+    if encoding_format == "base64":
+        return base64.b64encode(vector.tobytes()).decode("ascii")
+    return vector.tolist()
+
+@app.route("/v1/embeddings", methods=["POST"])
+def embeddings():
+
+    data = request.get_json()
+    inputs = data.get("input")
+    inputs = [inputs] if isinstance(inputs, str) else inputs
+    dimensions = data.get("dimensions") or DEFAULT_DIMENSIONS
+
+    with stats_lock:
+        stats["embedding_requests"] += 1
+        stats["embedding_inputs"] += len(inputs)
+
+    time.sleep(EMBED_LATENCY + EMBED_LATENCY_PER_INPUT * len(inputs))
+
+    fault = inject_faults()
+    if fault:
+        return fault
+
+    return jsonify({
+        "object": "list",
+        "model": data.get("model"),
+        "data": [
+            {
+                "object": "embedding",
+                "index": i,
+                "embedding": fake_vector(text, dimensions, data.get("encoding_format"))
+            }
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0}
+    })
+
+@app.route("/v1/chat/completions", methods=["POST"])
+def chat_completions():
+
+    data = request.get_json()
+
+    with stats_lock:
+        stats["chat_requests"] += 1
+
+    time.sleep(CHAT_LATENCY)
+
+    fault = inject_faults()
+    if fault:
+        return fault
+
+    # analyze_query meminta JSON, generate_response meminta teks biasa
+    if (data.get("response_format") or {}).get("type") == "json_object":
+        content = json.dumps({
+            "product": None,
+            "package": None,
+            "intent": "lainnya",
+            "user_name": None,
+            "company_name": None,
+            "business_type": None
+        })
+    else:
+        content = "Baik kak, ini jawaban dari server tiruan."
+
+    return jsonify({
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": data.get("model"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    })
+
+@app.route("/stats", methods=["GET", "DELETE"])
+def get_stats():
+
+    with stats_lock:
+        if request.method == "DELETE":
+            for key in stats:
+                stats[key] = 0
+        return jsonify(dict(stats))
+
+# =========================
+# RUN
+# =========================
+if __name__ == "__main__":
+    app.run(port=PORT, threaded=True)
@@ -0,0 +1,203 @@
+import json
+import os
+import re
+from collections import Counter
+import numpy as np
+from bubbling import INPUT_FILE
+from evaluation import build_pairs, embed_texts, load_cache
+from main_chatbot import EmbeddingService, normalize_rows
+
+# =========================
+# CONFIG
+# =========================
+OUTPUT_FILE = "faq_graph.json"
+
+# Jumlah cluster k-means; None = otomatis sqrt(jumlah pertanyaan / 2)
+NUM_CLUSTERS = None
+KMEANS_ITERATIONS = 50
+KMEANS_SEED = 0
+
+# Cluster kecil tidak dijadikan node FAQ
+MIN_CLUSTER_SIZE = 3
+
+# Pertanyaan dianggap tercakup jika similarity ke centroid cluster >= nilai ini
+COVERAGE_THRESHOLD = 0.6
+
+# Jumlah contoh pertanyaan per node user
+EXAMPLE_QUESTIONS = 3
+
+STOPWORDS = {
+    "kak", "ka", "kakak", "min", "admin", "saya", "aku", "yang", "dan", "di", "ke", "dari",
+    "ini", "itu", "untuk", "ada", "apa", "bisa", "mau", "ya", "iya", "kah", "dengan", "atau",
+    "juga", "boleh", "tidak", "gak", "ga", "sudah", "udah", "nya", "halo", "hallo", "hai",
+    "selamat", "pagi", "siang", "sore", "malam", "terima", "kasih", "ok", "oke", "baik", "dong"
+}
+
+# =========================
+# CLUSTERING
+# =========================
+def kmeans(vectors, num_clusters):
+    """Spherical k-means (cosine) dengan inisialisasi k-means++, seluruhnya operasi matriks"""
+    rng = np.random.default_rng(KMEANS_SEED)
+
+    # k-means++: centroid berikutnya dipilih proporsional terhadap jarak ke centroid terdekat
+    centroids = [vectors[rng.integers(len(vectors))]]
+    closest = 1 - vectors @ centroids[0]
+
+    for _ in range(1, num_clusters):
+        weights = np.clip(closest, 0, None) ** 2
+        probabilities = weights / weights.sum() if weights.sum() > 0 else None
+        centroids.append(vectors[rng.choice(len(vectors), p=probabilities)])
+        closest = np.minimum(closest, 1 - vectors @ centroids[-1])
+
+    centroids = np.vstack(centroids)
+    labels = None
+
+    for _ in range(KMEANS_ITERATIONS):
+        new_labels = np.argmax(vectors @ centroids.T, axis=1)
+
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+
+        # Centroid baru = rata-rata anggota (dinormalisasi), cluster kosong tetap
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=num_clusters)
+        filled = counts > 0
+        centroids[filled] = normalize_rows(sums[filled])
+
+    return labels, centroids
+
+def representative_answer(answer_vectors):
+    """Memilih jawaban yang paling mirip dengan jawaban lain di cluster (medoid)"""
+    similarities = answer_vectors @ answer_vectors.T
+    return int(np.argmax(similarities.sum(axis=1)))
+
+def cluster_keywords(cluster_texts, document_frequency, total_documents, top_n=3):
+    """Label intent dari kata yang paling khas di cluster (tf-idf sederhana)"""
+    counts = Counter()
+    for text in cluster_texts:
+        counts.update(set(tokenize(text)))
+
+    scores = {
+        word: (count / len(cluster_texts)) * np.log(total_documents / document_frequency[word])
+        for word, count in counts.items()
+    }
+    return [word for word, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_n]]
+
+def tokenize(text):
+    return [
+        word for word in re.findall(r"[a-z]+", text.lower())
+        if len(word) > 2 and word not in STOPWORDS
+    ]
+
+# =========================
+# MAIN PROCESS
+# =========================
+def run_compiler():
+    """Membuat graph FAQ (format final_data.json) dari cluster pertanyaan user"""
+    if not os.path.exists(INPUT_FILE):
+        print(f"File {INPUT_FILE} tidak ditemukan.")
+        return
+
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    pairs = build_pairs(data)
+    service = EmbeddingService()
+    service.batcher = None
+    cache = load_cache()
+
+    print(f"Jumlah pasangan pertanyaan/jawaban: {len(pairs)}")
+    questions = normalize_rows(embed_texts(service, [pair["query"] for pair in pairs], cache))
+    answers = normalize_rows(embed_texts(service, [pair["answer"] for pair in pairs], cache))
+
+    num_clusters = NUM_CLUSTERS or max(1, int(np.sqrt(len(pairs) / 2)))
+    labels, centroids = kmeans(questions, num_clusters)
+    centroid_similarity = np.sum(questions * centroids[labels], axis=1)
+
+    document_frequency = Counter()
+    for pair in pairs:
+        document_frequency.update(set(tokenize(pair["query"])))
+
+    # Cluster terbesar mendapat nomor node terkecil
+    sizes = np.bincount(labels, minlength=num_clusters)
+    graph = {}
+    cluster_stats = []
+
+    for cluster in np.argsort(-sizes):
+        members = np.flatnonzero(labels == cluster)
+        if len(members) < MIN_CLUSTER_SIZE:
+            continue
+
+        keywords = cluster_keywords(
+            [pairs[i]["query"] for i in members], document_frequency, len(pairs)
+        )
+        intent = "_".join(keywords) or f"cluster_{cluster}"
+
+        # Contoh pertanyaan: yang paling dekat dengan centroid, tanpa duplikat
+        examples = []
+        for i in members[np.argsort(-centroid_similarity[members])]:
+            if pairs[i]["query"] not in examples:
+                examples.append(pairs[i]["query"])
+            if len(examples) == EXAMPLE_QUESTIONS:
+                break
+        answer = pairs[members[representative_answer(answers[members])]]["answer"]
+
+        user_node = f"N{len(graph) + 1}"
+        assistant_node = f"N{len(graph) + 2}"
+
+        graph[user_node] = {
+            "intent": " ".join(keywords) or intent,
+            "role": "user",
+            "texts": [{"chat": text} for text in examples],
+            "answers": {
+                intent: [{"to": assistant_node}]
+            }
+        }
+        graph[assistant_node] = {
+            "intent": intent,
+            "role": "assistant",
+            "texts": [{"chat": answer}],
+            "answers": {}
+        }
+
+        cluster_stats.append({
+            "node": user_node,
+            "intent": intent,
+            "size": int(len(members)),
+            "covered": int(np.sum(centroid_similarity[members] >= COVERAGE_THRESHOLD))
+        })
+
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(graph, f, indent=2, ensure_ascii=False)
+
+    print_stats(cluster_stats, len(pairs), num_clusters)
+
+def print_stats(cluster_stats, total_questions, num_clusters):
+    """Menampilkan ukuran cluster dan cakupan graph"""
+    clustered = sum(item["size"] for item in cluster_stats)
+    covered = sum(item["covered"] for item in cluster_stats)
+    sizes = [item["size"] for item in cluster_stats] or [0]
+
+    print()
+    print(f"{'node':<8}{'ukuran':>8}{'tercakup':>10}  intent")
+    for item in cluster_stats:
+        print(f"{item['node']:<8}{item['size']:>8}{item['covered']:>10}  {item['intent']}")
+
+    print()
+    print(f"Cluster k-means: {num_clusters}, node FAQ (ukuran >= {MIN_CLUSTER_SIZE}): {len(cluster_stats)}")
+    print(f"Ukuran cluster: min {min(sizes)}, median {int(np.median(sizes))}, max {max(sizes)}")
+    print(f"Pertanyaan di cluster FAQ: {clustered}/{total_questions} ({clustered / total_questions:.1%})")
+    print(
+        f"Pertanyaan dengan similarity >= {COVERAGE_THRESHOLD} ke centroid: "
+        f"{covered}/{total_questions} ({covered / total_questions:.1%})"
+    )
+    print(f"Graph disimpan di: {OUTPUT_FILE}")
+
+# =========================
+# RUN
+# =========================
+if __name__ == "__main__":
+    run_compiler()
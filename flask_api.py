@@ -6,6 +6,23 @@ app = Flask(__name__)
 # Import main program chatbot
 chatbot = ChatBot()
 
+# Batas jumlah pesan dalam satu request /chat/batch
+BATCH_MAX_ITEMS = 50
+
+def format_result(conv_id, result):
+    """Menyusun field response untuk satu pesan"""
+    return {
+        "status": "success",
+        "conv_id": conv_id,
+        "response": result.get("answer"),
+        "product": result.get("product"),
+        "package": result.get("package"),
+        "intent": result.get("intent"),
+        "user_name": result.get("user_name"),
+        "company_name": result.get("company_name"),
+        "business_type": result.get("business_type")
+    }
+
 @app.route("/chat", methods=["POST"])
 def chat():
 
@@ -25,17 +42,7 @@ def chat():
     try:
         result = chatbot.chat(message, conv_id)
 
-        return jsonify({
-            "status": "success",
-            "conv_id": conv_id,
-            "response": result.get("answer"),
-            "product": result.get("product"),
-            "package": result.get("package"),
-            "intent": result.get("intent"),
-            "user_name": result.get("user_name"),
-            "company_name": result.get("company_name"),
-            "business_type": result.get("business_type")
-        }), 200
+        return jsonify(format_result(conv_id, result)), 200
 
     except Exception as e:
         return jsonify({
@@ -43,8 +50,68 @@ def chat():
             "message": str(e)
         }), 500
 
+@app.route("/chat/batch", methods=["POST"])
+def chat_batch():
+
+    data = request.get_json()
+
+    if not data:
+        return jsonify({"error": "JSON tidak boleh kosong"}), 400
+
+    items = data.get("items")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            "error": "items wajib berisi daftar {conv_id, message}"
+        }), 400
+
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({
+            "error": f"Maksimal {BATCH_MAX_ITEMS} pesan per request"
+        }), 400
+
+    pairs = []
+    for item in items:
+        conv_id = item.get("conv_id") if isinstance(item, dict) else None
+        message = item.get("message") if isinstance(item, dict) else None
+
+        if not conv_id or not message:
+            return jsonify({
+                "error": "conv_id dan message wajib diisi di setiap item"
+            }), 400
+
+        pairs.append((conv_id, message))
+
+    results = []
+    for (conv_id, _), result in zip(pairs, chatbot.chat_batch(pairs)):
+        if isinstance(result, Exception):
+            results.append({
+                "status": "error",
+                "conv_id": conv_id,
+                "message": str(result)
+            })
+        else:
+            results.append(format_result(conv_id, result))
+
+    return jsonify({
+        "status": "success",
+        "results": results
+    }), 200
+
+@app.route("/stats", methods=["GET"])
+def stats():
+
+    return jsonify({
+        "status": "success",
+        "search": chatbot.embedding_service.get_search_stats(),
+        "singleflight": {
+            **chatbot.singleflight.get_stats(),
+            **chatbot.embedding_service.singleflight.get_stats()
+        }
+    }), 200
+
 # =========================
 # RUN
 # =========================
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
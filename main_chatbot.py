@@ -1,10 +1,18 @@
 import os
 import numpy as np
 import json
+import queue
+import re
 import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, OpenAIError
+from resilience import CircuitBreaker, Deadline, DeadlineExceeded, ResilienceError, resilient_call
+from singleflight import SingleFlight, normalize_key
 
 # ===============================
 # LOAD API
@@ -12,8 +20,11 @@ from openai import OpenAI
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY tidak ditemukan di file .env")
+def create_client() -> OpenAI:
+    """Membuat client OpenAI; API key hanya diwajibkan saat API benar-benar dipakai"""
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY tidak ditemukan di file .env")
+    return OpenAI(api_key=OPENAI_API_KEY)
 
 # ===============================
 # CONFIG
@@ -25,6 +36,105 @@ LLM_MODEL = "gpt-4o-mini"
 SIMILARITY_THRESHOLD = 0.5
 TOP_K = 3
 
+# Mode penyimpanan vektor di memori: "float32", "float16", atau "int8".
+# float16/int8 menghemat memori, tapi dengan INDEX_MODE = "sqlite" shortlist di-re-rank
+# dengan vektor presisi penuh yang dibaca dari database di setiap query (lebih lambat).
+# Dengan INDEX_MODE = "shared", re-rank memakai vektor penuh dari file mmap.
+QUANTIZATION_MODE = "float32"
+RERANK_CANDIDATES = 20
+SCORE_BLOCK_SIZE = 1024
+
+# Dimensi embedding (harus sama dengan EMBED_DIMENSIONS di bubbling.py).
+# COARSE_DIMENSIONS < EMBEDDING_DIMENSIONS (misal 256) mengaktifkan pencarian dua tahap:
+# coarse pass dengan prefix vektor (Matryoshka), lalu refine dengan vektor penuh.
+EMBEDDING_DIMENSIONS = 1536
+COARSE_DIMENSIONS = 1536
+METADATA_TABLE = "index_metadata"
+
+# Sumber index: "sqlite" (setiap worker load sendiri) atau "shared"
+# (index dibangun sekali dengan build_index.py lalu di-mmap read-only oleh semua worker)
+INDEX_MODE = "sqlite"
+INDEX_DIR = "vector_index"
+INDEX_REFRESH_INTERVAL = 5.0
+INDEX_KEEP_GENERATIONS = 2
+
+# Micro-batching embedding query: request yang datang bersamaan digabung
+# selama EMBED_BATCH_MAX_WAIT detik atau sampai EMBED_BATCH_MAX_SIZE input
+EMBED_BATCHING = True
+EMBED_BATCH_MAX_SIZE = 64
+EMBED_BATCH_MAX_WAIT = 0.005
+EMBED_BATCH_CONCURRENCY = 4
+
+# Jumlah thread untuk memproses /chat/batch
+CHAT_BATCH_WORKERS = 8
+
+# Budget latency per request /chat (detik), dibagi ke setiap call OpenAI.
+# Timeout per call tidak melewati sisa budget.
+REQUEST_LATENCY_BUDGET = 25.0
+ANALYZE_TIMEOUT = 8.0
+EMBEDDING_TIMEOUT = 3.0
+GENERATION_TIMEOUT = 20.0
+UPSTREAM_RETRIES = 2
+
+# Hedged request untuk embedding: kirim duplikat jika belum selesai setelah delay ini
+EMBEDDING_HEDGE_DELAY = 0.5
+
+# Circuit breaker: terbuka setelah gagal beruntun, dicoba lagi setelah reset timeout
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30.0
+
+# Fallback leksikal saat embedding tidak tersedia
+LEXICAL_THRESHOLD = 0.3
+
+# Jika LLM tidak tersedia, jawaban assistant dari chunk dipakai langsung
+# asalkan similarity-nya minimal nilai ini
+CACHED_ANSWER_THRESHOLD = 0.85
+
+# Hot tier: chunk dengan priority >= HOT_PRIORITY dicari lebih dulu. Pencarian berhenti
+# di hot tier jika skor terbaiknya >= SIMILARITY_THRESHOLD + HOT_TIER_MARGIN.
+# HOT_PRIORITY harus sama dengan HOT_PRIORITY di set_priority.py.
+HOT_PRIORITY = 1
+HOT_TIER_MARGIN = 0.15
+
+# Memory percakapan: hanya HISTORY_WINDOW exchange terakhir yang disimpan utuh.
+# Exchange yang keluar dari window diringkas di background setiap SUMMARY_BATCH_SIZE exchange.
+HISTORY_WINDOW = 3
+SUMMARY_BATCH_SIZE = 3
+SUMMARY_MAX_PENDING = 12
+SUMMARY_TIMEOUT = 15.0
+SUMMARY_MAX_TOKENS = 300
+SUMMARY_WORKERS = 2
+
+# Singleflight: request identik yang datang bersamaan berbagi satu call upstream.
+# Call bersama memakai budget per jenis call di bawah ini, dihitung sejak call dibuat
+# (termasuk waktu antri di pool); setiap request hanya menunggu sesuai sisa budget-nya sendiri.
+SINGLEFLIGHT_TIMEOUTS = {
+    "embedding": 10.0,
+    "analyze": 12.0
+}
+SINGLEFLIGHT_WORKERS = 64
+
+TECHNICAL_ISSUE_MESSAGE = "Maaf kak, sedang ada kendala teknis. Bisa dicoba lagi nanti ya."
+
+# ===============================
+# HELPERS
+# ===============================
+def extract_cached_answer(chunk_text: str) -> str:
+    """Mengambil bubble assistant pertama dari teks chunk (format "Role:\nteks")"""
+    answer_lines = None
+
+    for line in chunk_text.split("\n"):
+        if line in ("User:", "Assistant:", "Agent:"):
+            if answer_lines:
+                break
+            answer_lines = [] if line != "User:" else None
+            continue
+
+        if answer_lines is not None:
+            answer_lines.append(line)
+
+    return "\n".join(answer_lines).strip() if answer_lines else ""
+
 # ===============================
 # MEMORY CLASS
 # ===============================
@@ -33,7 +143,13 @@ class ConversationMemory:
     """Menyimpan konteks percakapan"""
 
     conv_id: str
-    history: list[dict] = field(default_factory=list)
+
+    # Ring buffer exchange terakhir, exchange lama masuk ke ringkasan
+    history: deque = field(default_factory=lambda: deque(maxlen=HISTORY_WINDOW))
+    summary: str = ""
+    pending_summary: list[dict] = field(default_factory=list)
+    summarizing: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
     # Produk, package, dan intent
     current_product: str = ""
@@ -47,10 +163,266 @@ class ConversationMemory:
     
     def add_exchange(self, user_query: str, assistant_response: str):
         """Menambahkan percakapan baru ke history"""
-        self.history.append({
-            "user": user_query,
-            "assistant": assistant_response
-        })
+        with self.lock:
+            # Exchange tertua yang keluar dari window menunggu untuk diringkas
+            if len(self.history) == self.history.maxlen:
+                self.pending_summary.append(self.history[0])
+                del self.pending_summary[:-SUMMARY_MAX_PENDING]
+
+            self.history.append({
+                "user": user_query,
+                "assistant": assistant_response
+            })
+
+    def get_context(self) -> tuple[str, list[dict]]:
+        """Mengambil ringkasan dan exchange yang belum masuk ringkasan untuk prompt.
+        Exchange yang menunggu diringkas tetap dikirim utuh sampai finish_summary menghapusnya."""
+        with self.lock:
+            return self.summary, self.pending_summary + list(self.history)
+
+    def take_pending_summary(self) -> list[dict] | None:
+        """Mengambil batch exchange untuk diringkas jika sudah cukup dan belum ada proses berjalan"""
+        with self.lock:
+            if self.summarizing or len(self.pending_summary) < SUMMARY_BATCH_SIZE:
+                return None
+
+            self.summarizing = True
+            return list(self.pending_summary)
+
+    def finish_summary(self, turns: list[dict], summary: str | None):
+        """Menyimpan ringkasan baru; jika gagal, exchange tetap menunggu untuk batch berikutnya"""
+        with self.lock:
+            if summary:
+                self.summary = summary
+                self.pending_summary = [
+                    turn for turn in self.pending_summary
+                    if not any(turn is done for done in turns)
+                ]
+
+            self.summarizing = False
+
+# ===============================
+# QUANTIZATION
+# ===============================
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Menormalisasi setiap baris agar cosine similarity cukup dihitung dengan dot product"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+def quantize_matrix(
+    matrix: np.ndarray,
+    mode: str,
+    scales: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """Mengubah matriks float32 ke representasi kompak (float32, float16, atau int8).
+    Untuk int8, scales dari index yang sudah ada bisa dipakai ulang."""
+    if mode == "float32":
+        return matrix.astype(np.float32), None
+
+    if mode == "float16":
+        return matrix.astype(np.float16), None
+
+    if mode == "int8":
+        # Skala per dimensi: nilai absolut terbesar dipetakan ke 127
+        if scales is None:
+            scales = np.abs(matrix).max(axis=0, initial=0.0) / 127.0
+            scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(matrix / scales), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    raise ValueError(f"Mode quantization tidak dikenal: {mode}")
+
+def score_matrix(matrix: np.ndarray, scales: np.ndarray | None, query: np.ndarray) -> np.ndarray:
+    """Menghitung skor dot product terhadap matriks kompak per blok agar memori sementara tetap kecil"""
+    if scales is not None:
+        # x ~ q * scale, sehingga x . y ~ q . (scale * y)
+        query = query * scales
+
+    # query bisa 1 dimensi (satu query) atau 2 dimensi (batch query per baris)
+    query = query.astype(np.float32)
+
+    if matrix.dtype == np.float32:
+        return matrix @ query.T
+
+    scores = np.empty((matrix.shape[0],) + query.shape[:-1], dtype=np.float32)
+    for start in range(0, matrix.shape[0], SCORE_BLOCK_SIZE):
+        block = matrix[start:start + SCORE_BLOCK_SIZE]
+        scores[start:start + SCORE_BLOCK_SIZE] = block.astype(np.float32) @ query.T
+
+    return scores
+
+# ===============================
+# VECTOR INDEX
+# ===============================
+@dataclass
+class VectorIndex:
+    """Menyimpan matriks embeddings yang sudah dimuat (dari SQLite atau shared index)"""
+
+    entries: list[dict]
+    matrix: np.ndarray
+    scales: np.ndarray | None
+    quantization: str
+    dimensions: int
+    coarse_dimensions: int
+
+    # Vektor presisi penuh untuk re-rank, None jika diambil dari database
+    full_matrix: np.ndarray | None = None
+
+    # Nomor generation shared index (0 jika dimuat langsung dari SQLite)
+    generation: int = 0
+
+    # Token per chunk untuk fallback leksikal (dibuat saat pertama dibutuhkan)
+    tokens: list[set] | None = None
+
+    # Hot tier: baris prioritas tinggi beserta vektor presisi penuhnya
+    hot_rows: np.ndarray | None = None
+    hot_matrix: np.ndarray | None = None
+
+    @property
+    def needs_rerank(self) -> bool:
+        return self.matrix is not self.full_matrix
+
+def read_index_metadata(cursor: sqlite3.Cursor) -> dict:
+    """Membaca metadata index (model dan dimensi) jika tabelnya ada"""
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (METADATA_TABLE,)
+    )
+    if not cursor.fetchone():
+        return {}
+
+    cursor.execute(f"SELECT key, value FROM {METADATA_TABLE}")
+    return dict(cursor.fetchall())
+
+def build_hot_tier(entries: list[dict], full_matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Memilih chunk prioritas tinggi dan menyalin vektor penuhnya ke matriks kecil"""
+    hot_rows = np.array(
+        [row for row, entry in enumerate(entries) if entry.get("priority", 0) >= HOT_PRIORITY],
+        dtype=np.int64
+    )
+    hot_matrix = np.array(full_matrix[hot_rows], dtype=np.float32)
+    return hot_rows, hot_matrix
+
+def build_vector_index(
+    entries: list[dict],
+    matrix: np.ndarray,
+    quantization: str,
+    coarse_dimensions: int,
+    keep_full: bool = True
+) -> VectorIndex:
+    """Membuat VectorIndex dari matriks float32 mentah"""
+    dimensions = matrix.shape[1]
+
+    # Coarse matrix: prefix vektor yang dinormalisasi ulang
+    full_matrix = normalize_rows(matrix)
+    coarse_matrix = normalize_rows(matrix[:, :coarse_dimensions])
+    compact, scales = quantize_matrix(coarse_matrix, quantization)
+    hot_rows, hot_matrix = build_hot_tier(entries, full_matrix)
+
+    if quantization == "float32" and coarse_dimensions == dimensions:
+        full_matrix = compact
+    elif not keep_full:
+        full_matrix = None
+
+    return VectorIndex(
+        entries=entries,
+        matrix=compact,
+        scales=scales,
+        quantization=quantization,
+        dimensions=dimensions,
+        coarse_dimensions=coarse_dimensions,
+        full_matrix=full_matrix,
+        hot_rows=hot_rows,
+        hot_matrix=hot_matrix
+    )
+
+def read_index_generation(index_dir: str) -> int:
+    """Membaca nomor generation aktif dari file CURRENT"""
+    try:
+        with open(os.path.join(index_dir, "CURRENT"), "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def generation_dir(index_dir: str, generation: int) -> str:
+    return os.path.join(index_dir, f"gen-{generation:06d}")
+
+# ===============================
+# EMBEDDING BATCHER
+# ===============================
+class EmbeddingBatcher:
+    """Menggabungkan request embedding dari banyak thread menjadi satu batch API call"""
+
+    def __init__(self, embed_fn):
+        # embed_fn(list[str]) -> list[list[float]]
+        self.embed_fn = embed_fn
+        self.max_batch_size = EMBED_BATCH_MAX_SIZE
+        self.max_wait = EMBED_BATCH_MAX_WAIT
+
+        self.pending: queue.Queue = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=EMBED_BATCH_CONCURRENCY)
+        self.dispatcher = None
+        self.lock = threading.Lock()
+
+        # Statistik: jumlah input dan jumlah API call
+        self.inputs = 0
+        self.upstream_calls = 0
+
+    def submit(self, text: str) -> Future:
+        """Memasukkan teks ke antrian dan mengembalikan Future berisi vektor"""
+        with self.lock:
+            if self.dispatcher is None:
+                self.dispatcher = threading.Thread(target=self.run_dispatcher, daemon=True)
+                self.dispatcher.start()
+
+        future = Future()
+        self.pending.put((text, future))
+        return future
+
+    def embed(self, text: str, deadline: Deadline = None) -> list[float]:
+        future = self.submit(text)
+        try:
+            return future.result(timeout=deadline.remaining() if deadline else None)
+        except FutureTimeoutError:
+            # Future yang sudah selesai berarti error berasal dari batch itu sendiri
+            if future.done():
+                raise
+            raise DeadlineExceeded("Budget latency habis saat menunggu batch embedding")
+
+    def run_dispatcher(self):
+        """Mengumpulkan antrian selama max_wait atau sampai max_batch_size lalu mengirim batch"""
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self.executor.submit(self.send_batch, batch)
+
+    def send_batch(self, batch: list[tuple[str, Future]]):
+        """Mengirim satu batch ke API dan membagikan hasilnya ke setiap pemanggil"""
+        try:
+            vectors = self.embed_fn([text for text, _ in batch])
+
+            with self.lock:
+                self.inputs += len(batch)
+                self.upstream_calls += 1
+
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
 
 # ===============================
 # EMBEDDING CLASS
@@ -59,64 +431,445 @@ class EmbeddingService:
     """Mengelola embeddings menggunakan text-embedding-3-small"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
-        self.embeddings_data = []
+        # Tanpa API key service tetap bisa membaca database dan membangun index (build_index.py)
+        self.client = create_client() if OPENAI_API_KEY else None
         self.similarity_threshold = SIMILARITY_THRESHOLD
-        
-    def load_embeddings(self, db_path: str, table_name: str = "conversation_embeddings"):
-        """Load embeddings dari SQLite database"""
+
+        # Konfigurasi index: mode quantization dan dimensi coarse pass
+        self.quantization = QUANTIZATION_MODE
+        self.dimensions = EMBEDDING_DIMENSIONS
+        self.coarse_dimensions = COARSE_DIMENSIONS
+
+        # Index aktif, diganti secara atomik saat reload
+        self.index = VectorIndex(
+            entries=[],
+            matrix=np.zeros((0, self.coarse_dimensions), dtype=np.float32),
+            scales=None,
+            quantization=self.quantization,
+            dimensions=self.dimensions,
+            coarse_dimensions=self.coarse_dimensions
+        )
+
+        self.db_path = None
+        self.table_name = None
+
+        # Shared index (memory-mapped) untuk multi worker
+        self.index_dir = None
+        self.last_index_check = 0.0
+
+        # Statistik pencarian (hot tier vs pencarian penuh)
+        self.stats_lock = threading.Lock()
+        self.search_stats = {"queries": 0, "hot_hits": 0, "hot_ms": 0.0, "full_queries": 0, "full_ms": 0.0}
+
+        self.singleflight = SingleFlight(SINGLEFLIGHT_WORKERS)
+        self.breaker = CircuitBreaker("embedding", BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self.batcher = EmbeddingBatcher(self.create_embeddings) if EMBED_BATCHING else None
+
+    @property
+    def embeddings_data(self) -> list[dict]:
+        return self.index.entries
+
+    def read_database(self, db_path: str, table_name: str) -> tuple[list[dict], np.ndarray]:
+        """Membaca teks dan vektor dari SQLite serta memvalidasi model dan dimensinya"""
+        if not 0 < self.coarse_dimensions <= self.dimensions:
+            raise ValueError(
+                f"COARSE_DIMENSIONS ({self.coarse_dimensions}) harus antara 1 dan {self.dimensions}"
+            )
+
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
 
-        cursor.execute(f"SELECT text, vector FROM {table_name}")
+        metadata = read_index_metadata(cursor)
+
+        cursor.execute(f"SELECT id, text, vector, priority FROM {table_name} ORDER BY id")
         rows = cursor.fetchall()
 
-        self.embeddings_data = []
+        conn.close()
+
+        if metadata.get("embed_model", EMBEDDING_MODEL) != EMBEDDING_MODEL:
+            raise ValueError(
+                f"Model index ({metadata['embed_model']}) berbeda dengan EMBEDDING_MODEL ({EMBEDDING_MODEL})"
+            )
+
+        if int(metadata.get("dimensions", self.dimensions)) != self.dimensions:
+            raise ValueError(
+                f"Dimensi index ({metadata['dimensions']}) berbeda dengan EMBEDDING_DIMENSIONS ({self.dimensions})"
+            )
+
+        entries = []
+        vectors = []
 
-        for text, vector in rows:
-            self.embeddings_data.append({
+        for row_id, text, vector, priority in rows:
+            entries.append({
+                "id": row_id,
                 "text": text,
-                "vector": json.loads(vector)
+                "priority": priority or 0
             })
+            vectors.append(np.asarray(json.loads(vector), dtype=np.float32))
 
-        conn.close()
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, self.dimensions), dtype=np.float32)
+
+        if matrix.shape[1] != self.dimensions:
+            raise ValueError(
+                f"Panjang vektor di database ({matrix.shape[1]}) berbeda dengan EMBEDDING_DIMENSIONS ({self.dimensions})"
+            )
+
+        return entries, matrix
+        
+    def load_embeddings(self, db_path: str, table_name: str = "conversation_embeddings", quantization: str = None):
+        """Load embeddings dari SQLite database"""
+        quantization = quantization or self.quantization
+        entries, matrix = self.read_database(db_path, table_name)
+
+        # Vektor penuh tidak disimpan di memori untuk mode kompak
+        self.index = build_vector_index(
+            entries, matrix, quantization, self.coarse_dimensions, keep_full=False
+        )
+
+        self.quantization = quantization
+        self.db_path = db_path
+        self.table_name = table_name
+
+    def publish_index(self, db_path: str, table_name: str, index_dir: str, quantization: str = None) -> int:
+        """Membangun index dari SQLite dan menyimpannya sebagai file .npy untuk di-mmap oleh worker"""
+        quantization = quantization or self.quantization
+        entries, matrix = self.read_database(db_path, table_name)
+        index = build_vector_index(entries, matrix, quantization, self.coarse_dimensions)
+
+        os.makedirs(index_dir, exist_ok=True)
+        generation = read_index_generation(index_dir) + 1
+        target_dir = generation_dir(index_dir, generation)
+        tmp_dir = target_dir + ".tmp"
+
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        np.save(os.path.join(tmp_dir, "matrix.npy"), index.matrix)
+
+        # float32 tanpa coarse pass: full_matrix sama dengan matrix, tidak perlu disimpan dua kali
+        if index.needs_rerank:
+            np.save(os.path.join(tmp_dir, "full_matrix.npy"), index.full_matrix)
+        if index.scales is not None:
+            np.save(os.path.join(tmp_dir, "scales.npy"), index.scales)
+
+        with open(os.path.join(tmp_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "generation": generation,
+                "embed_model": EMBEDDING_MODEL,
+                "quantization": quantization,
+                "dimensions": index.dimensions,
+                "coarse_dimensions": index.coarse_dimensions,
+                "entries": entries
+            }, f, ensure_ascii=False)
+
+        os.replace(tmp_dir, target_dir)
+
+        # Worker membaca CURRENT untuk mengetahui generation terbaru
+        current_tmp = os.path.join(index_dir, "CURRENT.tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(str(generation))
+        os.replace(current_tmp, os.path.join(index_dir, "CURRENT"))
+
+        # Hapus generation lama; worker yang masih me-mmap file lama tetap aman
+        for old in range(1, generation - INDEX_KEEP_GENERATIONS + 1):
+            old_dir = generation_dir(index_dir, old)
+            if os.path.isdir(old_dir):
+                for name in os.listdir(old_dir):
+                    try:
+                        os.remove(os.path.join(old_dir, name))
+                    except OSError:
+                        pass
+                try:
+                    os.rmdir(old_dir)
+                except OSError:
+                    pass
+
+        return generation
+
+    def attach_index(self, index_dir: str):
+        """Memuat shared index secara read-only (memory-mapped) dari generation terbaru"""
+        generation = read_index_generation(index_dir)
+        if not generation:
+            raise FileNotFoundError(
+                f"Shared index di {index_dir} belum tersedia, jalankan build_index.py terlebih dahulu"
+            )
+
+        source_dir = generation_dir(index_dir, generation)
+
+        with open(os.path.join(source_dir, "index.json"), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+        if metadata["embed_model"] != EMBEDDING_MODEL or metadata["dimensions"] != self.dimensions:
+            raise ValueError(
+                f"Shared index ({metadata['embed_model']}, {metadata['dimensions']} dimensi) "
+                f"berbeda dengan konfigurasi ({EMBEDDING_MODEL}, {self.dimensions} dimensi)"
+            )
+
+        matrix = np.load(os.path.join(source_dir, "matrix.npy"), mmap_mode="r")
+
+        # float32 tanpa coarse pass: matrix dan full_matrix adalah data yang sama
+        if metadata["quantization"] == "float32" and metadata["coarse_dimensions"] == metadata["dimensions"]:
+            full_matrix = matrix
+        else:
+            full_matrix = np.load(os.path.join(source_dir, "full_matrix.npy"), mmap_mode="r")
+
+        scales_path = os.path.join(source_dir, "scales.npy")
+        scales = np.load(scales_path) if os.path.exists(scales_path) else None
+
+        hot_rows, hot_matrix = build_hot_tier(metadata["entries"], full_matrix)
+
+        self.index = VectorIndex(
+            entries=metadata["entries"],
+            matrix=matrix,
+            scales=scales,
+            quantization=metadata["quantization"],
+            dimensions=metadata["dimensions"],
+            coarse_dimensions=metadata["coarse_dimensions"],
+            full_matrix=full_matrix,
+            generation=generation,
+            hot_rows=hot_rows,
+            hot_matrix=hot_matrix
+        )
+
+        self.quantization = metadata["quantization"]
+        self.coarse_dimensions = metadata["coarse_dimensions"]
+        self.index_dir = index_dir
+        self.last_index_check = time.monotonic()
+
+    def refresh_index(self):
+        """Memeriksa generation shared index secara berkala dan reload jika berubah"""
+        if not self.index_dir:
+            return
+
+        now = time.monotonic()
+        if now - self.last_index_check < INDEX_REFRESH_INTERVAL:
+            return
+        self.last_index_check = now
+
+        generation = read_index_generation(self.index_dir)
+        if generation == self.index.generation:
+            return
+
+        # Reload gagal (generation sudah dihapus, dimensi berbeda, file rusak):
+        # tetap melayani dengan index saat ini dan coba lagi di interval berikutnya
+        try:
+            self.attach_index(self.index_dir)
+        except (OSError, ValueError, KeyError) as e:
+            print(
+                f"Gagal reload shared index generation {generation}, "
+                f"tetap memakai generation {self.index.generation}: {e}"
+            )
+
+    def memory_usage(self) -> int:
+        """Menghitung ukuran matriks embeddings di memori (bytes)"""
+        index = self.index
+        total = index.matrix.nbytes
+
+        if index.scales is not None:
+            total += index.scales.nbytes
+
+        if index.full_matrix is not None and index.needs_rerank:
+            total += index.full_matrix.nbytes
 
-    def get_embedding(self, text: str) -> list[float]:
+        return total
+
+    def create_embeddings(self, texts: list[str], deadline: Deadline = None) -> list[list[float]]:
+        """Memanggil API embedding dengan timeout, retry, hedging, dan circuit breaker"""
+        deadline = deadline or Deadline(REQUEST_LATENCY_BUDGET)
+
+        if self.client is None:
+            self.client = create_client()
+
+        def call(timeout: float) -> list[list[float]]:
+            response = self.client.with_options(timeout=timeout, max_retries=0).embeddings.create(
+                model = EMBEDDING_MODEL,
+                input = texts,
+                dimensions = self.dimensions
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+        return resilient_call(
+            call, deadline, self.breaker, EMBEDDING_TIMEOUT,
+            retries=UPSTREAM_RETRIES, hedge_delay=EMBEDDING_HEDGE_DELAY
+        )
+
+    def get_embedding(self, text: str, deadline: Deadline = None) -> list[float]:
         """Melakukan embedding pada input user"""
-        response = self.client.embeddings.create(
-            model = EMBEDDING_MODEL,
-            input = text
+        deadline = deadline or Deadline(REQUEST_LATENCY_BUDGET)
+
+        def call(flight_deadline: Deadline) -> list[float]:
+            if self.batcher is not None:
+                return self.batcher.embed(text, flight_deadline)
+            return self.create_embeddings([text], flight_deadline)[0]
+
+        # Teks identik yang sedang di-embed cukup dikirim sekali
+        return self.singleflight.do(
+            "embedding", normalize_key(text), call,
+            SINGLEFLIGHT_TIMEOUTS["embedding"], timeout=deadline.remaining()
         )
-        return response.data[0].embedding
     
     def cosine_similarity(self, a: list[float], b: list[float]) -> float:
         """Menghitung cosine similarity antara input user dengan vektor bubble"""
         a = np.array(a)
         b = np.array(b)
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-    
-    def search_similar_chunks(self, query: str, top_k: int = TOP_K) -> tuple[list[tuple[dict, float]], float]:
-        """Mengambil top k jawaban paling mirip"""
-        query_embedding = self.get_embedding(query)
-        
-        similarities = []
-        for item in self.embeddings_data:
-            similarity = self.cosine_similarity(query_embedding, item['vector'])
-            similarities.append((item, similarity))
+
+    def fetch_full_vectors(self, index: VectorIndex, indices: np.ndarray) -> np.ndarray:
+        """Mengambil vektor presisi penuh untuk shortlist kandidat"""
+        if index.full_matrix is not None:
+            return np.asarray(index.full_matrix[indices])
+
+        # Ambil setiap baris unik sekali, lalu susun sesuai bentuk indices
+        unique = np.unique(indices)
+        ids = [index.entries[i]["id"] for i in unique]
+        placeholders = ",".join("?" * len(ids))
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(f"SELECT id, vector FROM {self.table_name} WHERE id IN ({placeholders})", ids)
+        vectors = {row_id: json.loads(vector) for row_id, vector in cursor.fetchall()}
+
+        conn.close()
+
+        unique_vectors = normalize_rows(np.array([vectors[row_id] for row_id in ids], dtype=np.float32))
+        return unique_vectors[np.searchsorted(unique, indices)]
+
+    def search_by_vectors(self, query_embeddings: list[list[float]], top_k: int = TOP_K) -> list[tuple[list[tuple[dict, float]], float]]:
+        """Mencari chunk paling mirip untuk banyak query sekaligus dalam satu operasi matriks"""
+        self.refresh_index()
+
+        # Snapshot index agar reload di thread lain tidak mengganggu pencarian ini
+        index = self.index
+
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+
+        if not index.entries:
+            return [([], 0) for _ in queries]
+
+        if queries.shape[1] != index.dimensions:
+            raise ValueError(
+                f"Dimensi query ({queries.shape[1]}) berbeda dengan dimensi index ({index.dimensions})"
+            )
+
+        full_queries = normalize_rows(queries)
+        results = [None] * len(queries)
+        remaining = np.arange(len(queries))
+
+        # Hot tier: chunk prioritas tinggi dicari lebih dulu dengan presisi penuh
+        hot_hits = 0
+        hot_start = time.perf_counter()
+
+        if index.hot_rows is not None and len(index.hot_rows):
+            hot_scores = full_queries @ index.hot_matrix.T
+            confident = hot_scores.max(axis=1) >= self.similarity_threshold + HOT_TIER_MARGIN
+
+            for row in np.flatnonzero(confident):
+                results[row] = self.rank_results(index, index.hot_rows, hot_scores[row], top_k)
+
+            hot_hits = int(confident.sum())
+            remaining = np.flatnonzero(~confident)
+
+        hot_ms = (time.perf_counter() - hot_start) * 1000
+        full_start = time.perf_counter()
+
+        if len(remaining):
+            coarse_queries = normalize_rows(queries[remaining, :index.coarse_dimensions])
+            scores = score_matrix(index.matrix, index.scales, coarse_queries).T
+
+            # First-pass: ambil shortlist dari matriks kompak
+            candidates = max(top_k, RERANK_CANDIDATES) if index.needs_rerank else top_k
+            candidates = min(candidates, scores.shape[1])
+            shortlist = np.argpartition(-scores, candidates - 1, axis=1)[:, :candidates]
+
+            # Re-rank shortlist dengan vektor presisi penuh
+            if index.needs_rerank:
+                vectors = self.fetch_full_vectors(index, shortlist)
+                scores = np.einsum("qcd,qd->qc", vectors, full_queries[remaining])
+            else:
+                scores = np.take_along_axis(scores, shortlist, axis=1)
+
+            for position, row in enumerate(remaining):
+                results[row] = self.rank_results(index, shortlist[position], scores[position], top_k)
+
+        full_ms = (time.perf_counter() - full_start) * 1000
+
+        with self.stats_lock:
+            self.search_stats["queries"] += len(queries)
+            self.search_stats["hot_hits"] += hot_hits
+            self.search_stats["hot_ms"] += hot_ms
+            self.search_stats["full_queries"] += len(remaining)
+            self.search_stats["full_ms"] += full_ms
+
+        return results
+
+    def rank_results(self, index: VectorIndex, rows: np.ndarray, scores: np.ndarray, top_k: int) -> tuple[list[tuple[dict, float]], float]:
+        """Mengurutkan kandidat dan membuang yang di bawah threshold"""
+        order = np.argsort(-scores)[:top_k]
 
         # Hanya ambil chunk dengan similarity > threshold
         similarities = [
-            (item, sim) for item, sim in similarities
-            if sim >= self.similarity_threshold
+            (index.entries[rows[i]], float(scores[i])) for i in order
+            if scores[i] >= self.similarity_threshold
         ]
 
         if not similarities:
             return [], 0
-        
+
+        return similarities, similarities[0][1]
+
+    def get_search_stats(self) -> dict:
+        """Porsi query yang dijawab dari hot tier dan estimasi latency yang dihemat"""
+        with self.stats_lock:
+            stats = dict(self.search_stats)
+
+        queries = stats["queries"]
+        avg_full_ms = stats["full_ms"] / stats["full_queries"] if stats["full_queries"] else 0.0
+
+        # Setiap hit hot tier menghemat satu pencarian penuh, dikurangi biaya hot tier untuk semua query
+        saved_ms = stats["hot_hits"] * avg_full_ms - stats["hot_ms"]
+
+        return {
+            "queries": queries,
+            "hot_tier_size": 0 if self.index.hot_rows is None else len(self.index.hot_rows),
+            "hot_hits": stats["hot_hits"],
+            "hot_hit_rate": stats["hot_hits"] / queries if queries else 0.0,
+            "avg_full_search_ms": avg_full_ms,
+            "avg_hot_search_ms": stats["hot_ms"] / queries if queries else 0.0,
+            "latency_saved_ms": saved_ms
+        }
+
+    def search_by_vector(self, query_embedding: list[float], top_k: int = TOP_K) -> tuple[list[tuple[dict, float]], float]:
+        """Mencari chunk paling mirip dari vektor query (first-pass kompak lalu re-rank presisi penuh)"""
+        return self.search_by_vectors([query_embedding], top_k)[0]
+    
+    def search_similar_chunks(self, query: str, top_k: int = TOP_K, deadline: Deadline = None) -> tuple[list[tuple[dict, float]], float]:
+        """Mengambil top k jawaban paling mirip"""
+        query_embedding = self.get_embedding(query, deadline)
+        return self.search_by_vector(query_embedding, top_k)
+
+    def lexical_search(self, query: str, top_k: int = TOP_K) -> tuple[list[tuple[dict, float]], float]:
+        """Fallback tanpa API: skor = porsi kata query yang muncul di chunk"""
+        index = self.index
+        query_tokens = set(re.findall(r"\w+", query.lower()))
+
+        if not query_tokens or not index.entries:
+            return [], 0
+
+        # Token setiap chunk dihitung sekali per index
+        if index.tokens is None:
+            index.tokens = [set(re.findall(r"\w+", entry["text"].lower())) for entry in index.entries]
+
+        similarities = []
+        for entry, tokens in zip(index.entries, index.tokens):
+            score = len(query_tokens & tokens) / len(query_tokens)
+            if score >= LEXICAL_THRESHOLD:
+                similarities.append((entry, score))
+
+        if not similarities:
+            return [], 0
+
         similarities.sort(key=lambda x: x[1], reverse=True)
-        max_similarity = similarities[0][1] if similarities else 0
-        
-        return similarities[:top_k], max_similarity
+        return similarities[:top_k], similarities[0][1]
 
 # ===============================
 # CHATBOT CLASS
@@ -125,9 +878,21 @@ class ChatBot:
     """Main program ChatBot"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.client = create_client()
         self.embedding_service = EmbeddingService()
-        self.embedding_service.load_embeddings(DB_NAME, TABLE_NAME)
+        self.breaker = CircuitBreaker("chat", BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self.singleflight = SingleFlight(SINGLEFLIGHT_WORKERS)
+
+        # Breaker terpisah agar kegagalan ringkasan di background tidak membuka breaker chat
+        self.summary_breaker = CircuitBreaker("summary", BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+
+        # Ringkasan memory diperbarui di background, di luar jalur request
+        self.summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS)
+
+        if INDEX_MODE == "shared":
+            self.embedding_service.attach_index(INDEX_DIR)
+        else:
+            self.embedding_service.load_embeddings(DB_NAME, TABLE_NAME)
         
         self.conversations: dict[str, ConversationMemory] = {}
         
@@ -158,8 +923,71 @@ class ChatBot:
             self.conversations[conv_id] = ConversationMemory(conv_id=conv_id)
         return self.conversations[conv_id]
     
-    def analyze_query(self, query: str, conv_memory: ConversationMemory):
+    def build_response(self, conv_memory: ConversationMemory, query: str, assistant_response: str) -> dict:
+        """Menyimpan exchange ke memory dan menyusun hasil untuk API"""
+        conv_memory.add_exchange(query, assistant_response)
+        self.schedule_summary(conv_memory)
+        return {
+            "answer": assistant_response,
+            "product": conv_memory.current_product,
+            "package": conv_memory.current_package,
+            "intent": conv_memory.last_intent,
+            "user_name": conv_memory.user_name,
+            "company_name": conv_memory.company_name,
+            "business_type": conv_memory.business_type
+        }
+
+    def schedule_summary(self, conv_memory: ConversationMemory):
+        """Menjadwalkan update ringkasan jika sudah ada cukup exchange yang keluar dari window"""
+        turns = conv_memory.take_pending_summary()
+
+        if turns:
+            self.summary_executor.submit(self.update_summary, conv_memory, turns)
+
+    def update_summary(self, conv_memory: ConversationMemory, turns: list[dict]):
+        """Menggabungkan ringkasan lama dengan exchange yang keluar dari window"""
+        summary = None
+
+        conversation = "\n".join(
+            f"User: {turn['user']}\nAdmin: {turn['assistant']}" for turn in turns
+        )
+
+        summary_prompt = f"""
+        Perbarui ringkasan percakapan antara customer dan admin Asain.
+
+        RINGKASAN SAAT INI:
+        {conv_memory.summary or "-"}
+
+        PERCAKAPAN BARU:
+        {conversation}
+
+        ATURAN:
+        - Maksimal 150 kata.
+        - Simpan fakta penting: kebutuhan customer, produk/paket yang dibahas, harga yang disebut, keputusan, dan pertanyaan yang belum terjawab.
+        - Tulis dalam bahasa Indonesia tanpa pembuka atau penutup.
+        """
+
+        def call(timeout: float):
+            return self.client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model = LLM_MODEL,
+                messages = [{"role": "user", "content": summary_prompt}],
+                temperature = 0,
+                max_tokens = SUMMARY_MAX_TOKENS
+            )
+
+        try:
+            response = resilient_call(
+                call, Deadline(SUMMARY_TIMEOUT), self.summary_breaker, SUMMARY_TIMEOUT, retries=1
+            )
+            summary = response.choices[0].message.content.strip()
+        except Exception:
+            pass
+        finally:
+            conv_memory.finish_summary(turns, summary)
+
+    def analyze_query(self, query: str, conv_memory: ConversationMemory, deadline: Deadline = None):
         """Menentukan product dan package dari user query"""
+        deadline = deadline or Deadline(REQUEST_LATENCY_BUDGET)
 
         analysis_prompt = f"""
         Anda bertugas menganalisis pertanyaan user dan mengembalikan JSON dengan format:
@@ -217,14 +1045,30 @@ class ChatBot:
         {query}
         """
 
-        response = self.client.chat.completions.create(
-            model = LLM_MODEL,
-            messages = [{"role": "user", "content": analysis_prompt}],
-            temperature = 0,
-            response_format = {"type": "json_object"}
-        )
+        def call(timeout: float):
+            return self.client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model = LLM_MODEL,
+                messages = [{"role": "user", "content": analysis_prompt}],
+                temperature = 0,
+                response_format = {"type": "json_object"}
+            )
 
         try:
+            # Analisis bersifat opsional, cukup satu kali retry agar budget tersisa untuk jawaban
+            # Prompt hanya bergantung pada query dan konteks ini, jadi aman dibagi antar user
+            flight_key = (
+                normalize_key(query),
+                conv_memory.current_product,
+                conv_memory.current_package,
+                conv_memory.business_type
+            )
+            response = self.singleflight.do(
+                "analyze", flight_key,
+                lambda flight_deadline: resilient_call(
+                    call, flight_deadline, self.breaker, ANALYZE_TIMEOUT, retries=1
+                ),
+                SINGLEFLIGHT_TIMEOUTS["analyze"], timeout=deadline.remaining()
+            )
             result = json.loads(response.choices[0].message.content)
             return  (
                 result.get("product"),
@@ -239,8 +1083,9 @@ class ChatBot:
     
     def generate_response(self, query: str, conv_id: str) -> str:
         """Create jawaban untuk response"""
+        deadline = Deadline(REQUEST_LATENCY_BUDGET)
         conv_memory = self.get_or_create_conversation(conv_id)
-        product, package, intent, user, company, business = self.analyze_query(query, conv_memory)
+        product, package, intent, user, company, business = self.analyze_query(query, conv_memory, deadline)
 
         # Product fallback
         if not product and conv_memory.current_product:
@@ -280,22 +1125,23 @@ class ChatBot:
         if conv_memory.current_package:
             search_query += f" paket {conv_memory.current_package}. {search_query}"
 
-        similar_chunks, max_similarity = self.embedding_service.search_similar_chunks(
-            search_query, top_k = TOP_K
-        )
+        try:
+            similar_chunks, max_similarity = self.embedding_service.search_similar_chunks(
+                search_query, top_k = TOP_K, deadline = deadline
+            )
+            threshold = self.embedding_service.similarity_threshold
+
+        except (OpenAIError, ResilienceError):
+            # Embedding gagal atau circuit breaker terbuka: fallback ke pencarian leksikal
+            similar_chunks, max_similarity = self.embedding_service.lexical_search(query, top_k = TOP_K)
+            threshold = LEXICAL_THRESHOLD
+
+            if not similar_chunks:
+                return self.build_response(conv_memory, query, TECHNICAL_ISSUE_MESSAGE)
 
-        if max_similarity < self.embedding_service.similarity_threshold:
+        if max_similarity < threshold:
             assistant_response = "Maaf kak, informasi tersebut belum tersedia di database saya."
-            conv_memory.add_exchange(query, assistant_response)
-            return {
-                "answer": assistant_response,
-                "product": conv_memory.current_product,
-                "package": conv_memory.current_package,
-                "intent": conv_memory.last_intent,
-                "user_name": conv_memory.user_name,
-                "company_name": conv_memory.company_name,
-                "business_type": conv_memory.business_type
-            }
+            return self.build_response(conv_memory, query, assistant_response)
 
         reference_text = ""
         for i, (chunk, _) in enumerate(similar_chunks, 1):
@@ -348,41 +1194,72 @@ class ChatBot:
         
         messages = [{"role": "system", "content": self.system_prompt}]
 
-        for exchange in conv_memory.history[-3:]:
+        summary, recent_history = conv_memory.get_context()
+
+        # Ringkasan menggantikan exchange lama yang sudah diringkas; exchange yang
+        # belum diringkas dikirim utuh setelahnya
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"RINGKASAN PERCAKAPAN SEBELUMNYA:\n{summary}"
+            })
+
+        for exchange in recent_history:
             messages.append({"role": "user", "content": exchange["user"]})
             messages.append({"role": "assistant", "content": exchange["assistant"]})
         
         messages.append({"role": "user", "content": user_message})
 
-        try:
-            # Memanggil LLM OpenAI
-            response = self.client.chat.completions.create(
+        def call(timeout: float):
+            return self.client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
                 model = LLM_MODEL,
                 messages = messages,
                 temperature = 0.3,
                 max_tokens = 700
             )
+
+        try:
+            # Memanggil LLM OpenAI
+            response = resilient_call(call, deadline, self.breaker, GENERATION_TIMEOUT, retries=UPSTREAM_RETRIES)
             assistant_response = response.choices[0].message.content.strip()
             
         except Exception:
-            assistant_response = "Maaf kak, sedang ada kendala teknis. Bisa dicoba lagi nanti ya."
+            assistant_response = TECHNICAL_ISSUE_MESSAGE
+
+            # Fallback cache-only: pakai jawaban admin dari chunk yang hampir identik
+            if threshold == self.embedding_service.similarity_threshold and max_similarity >= CACHED_ANSWER_THRESHOLD:
+                assistant_response = extract_cached_answer(similar_chunks[0][0]["text"]) or TECHNICAL_ISSUE_MESSAGE
         
-        conv_memory.add_exchange(query, assistant_response)
-        return {
-            "answer": assistant_response,
-            "product": conv_memory.current_product,
-            "package": conv_memory.current_package,
-            "intent": conv_memory.last_intent,
-            "user_name": conv_memory.user_name,
-            "company_name": conv_memory.company_name,
-            "business_type": conv_memory.business_type
-        }
+        return self.build_response(conv_memory, query, assistant_response)
     
     def chat(self, user_input: str, conv_id: str = None):
         return self.generate_response(user_input, conv_id)
+
+    def chat_batch(self, items: list[tuple[str, str]]) -> list:
+        """Memproses banyak (conv_id, message) sekaligus, hasil berupa dict atau Exception"""
+        # Pesan dengan conv_id yang sama diproses berurutan agar memory tetap konsisten
+        groups: dict[str, list[int]] = {}
+        for position, (conv_id, _) in enumerate(items):
+            groups.setdefault(conv_id, []).append(position)
+
+        results = [None] * len(items)
+
+        def run_group(positions: list[int]):
+            for position in positions:
+                conv_id, message = items[position]
+                try:
+                    results[position] = self.chat(message, conv_id)
+                except Exception as e:
+                    results[position] = e
+
+        # Grup berjalan paralel sehingga embedding query ikut di-batch oleh EmbeddingBatcher
+        with ThreadPoolExecutor(max_workers=CHAT_BATCH_WORKERS) as executor:
+            list(executor.map(run_group, groups.values()))
+
+        return results
     
     def get_conversation_history(self, conv_id: str) -> list:
         """Mengambil history percakapan"""
         if conv_id in self.conversations:
-            return self.conversations[conv_id].history
+            return list(self.conversations[conv_id].history)
         return []
\ No newline at end of file
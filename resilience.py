@@ -0,0 +1,215 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import openai
+
+# =========================
+# CONFIG
+# =========================
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 2.0
+
+# Thread untuk hedged request. Jika semua thread terpakai, call dijalankan
+# langsung di thread pemanggil tanpa hedge.
+HEDGE_WORKERS = 16
+
+# =========================
+# ERRORS
+# =========================
+class ResilienceError(Exception):
+    """Error dari lapisan resilience (deadline habis atau circuit breaker terbuka)"""
+
+class DeadlineExceeded(ResilienceError):
+    """Budget latency request sudah habis"""
+
+class CircuitOpenError(ResilienceError):
+    """Circuit breaker terbuka, upstream tidak dipanggil"""
+
+class CallTimeout(ResilienceError):
+    """Call upstream (atau hedge-nya) tidak selesai dalam timeout per call"""
+
+# Error yang layak dicoba ulang (timeout, koneksi, rate limit, 5xx)
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    CallTimeout
+)
+
+# =========================
+# DEADLINE
+# =========================
+class Deadline:
+    """Budget latency untuk satu request, dibagi ke setiap call upstream"""
+
+    def __init__(self, budget: float):
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout_for(self, call_timeout: float) -> float:
+        """Timeout satu call: batas per call, tapi tidak melewati sisa budget"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Budget latency request sudah habis")
+        return min(call_timeout, remaining)
+
+# =========================
+# CIRCUIT BREAKER
+# =========================
+class CircuitBreaker:
+    """Circuit breaker sederhana: closed -> open setelah gagal beruntun -> half-open setelah reset_timeout"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.half_open_trial = False
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Menentukan apakah call boleh dikirim ke upstream"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+
+            # Half-open: izinkan satu call percobaan
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self.half_open_trial:
+                self.half_open_trial = True
+                return True
+
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.half_open_trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+
+            if self.half_open_trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.half_open_trial = False
+
+# =========================
+# CALL HELPERS
+# =========================
+hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS)
+
+# Slot thread hedge yang kosong; call hanya dikirim ke pool jika langsung mendapat thread
+hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+def submit_hedge(fn, expires_at: float):
+    """Menjalankan fn(sisa timeout) di pool hedge, None jika semua thread sedang dipakai"""
+    if not hedge_slots.acquire(blocking=False):
+        return None
+
+    def run():
+        try:
+            # Timeout dihitung saat thread mulai, bukan saat submit
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise CallTimeout("Timeout habis sebelum call dijalankan")
+            return fn(remaining)
+        finally:
+            hedge_slots.release()
+
+    return hedge_executor.submit(run)
+
+def hedged_call(fn, timeout: float, hedge_delay: float):
+    """Menjalankan fn(timeout); jika belum selesai setelah hedge_delay, kirim duplikat dan ambil yang tercepat"""
+    expires_at = time.monotonic() + timeout
+
+    primary = submit_hedge(fn, expires_at)
+    if primary is None:
+        # Pool penuh: jalankan langsung tanpa hedge agar tidak menambah antrian
+        return fn(timeout)
+
+    futures = [primary]
+    done, _ = wait(futures, timeout=hedge_delay)
+
+    if not done:
+        hedge = submit_hedge(fn, expires_at)
+        if hedge is not None:
+            futures.append(hedge)
+
+    error = None
+    pending = set(futures)
+
+    while pending:
+        remaining = max(0.0, expires_at - time.monotonic())
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+        if not done:
+            raise CallTimeout("Hedged call melewati timeout")
+
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+
+    raise error
+
+def resilient_call(
+    fn,
+    deadline: Deadline,
+    breaker: CircuitBreaker,
+    call_timeout: float,
+    retries: int = 2,
+    hedge_delay: float = None
+):
+    """Memanggil fn(timeout) dengan deadline, retry ber-jitter, hedging opsional, dan circuit breaker"""
+    attempt = 0
+
+    while True:
+        # Deadline dicek sebelum allow(): di state half-open allow() mengambil satu-satunya
+        # slot percobaan, yang harus selalu diakhiri dengan record_success/record_failure
+        timeout = deadline.timeout_for(call_timeout)
+
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit breaker {breaker.name} terbuka")
+
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                result = hedged_call(fn, timeout, hedge_delay)
+            else:
+                result = fn(timeout)
+
+        except RETRYABLE_ERRORS:
+            breaker.record_failure()
+            attempt += 1
+
+            # Full jitter backoff, tidak boleh melewati sisa budget
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            if attempt > retries or delay >= deadline.remaining():
+                raise
+
+            time.sleep(delay)
+            continue
+
+        except Exception:
+            # Error non-retryable (misal 400) berarti upstream tetap merespons
+            breaker.record_success()
+            raise
+
+        breaker.record_success()
+        return result
@@ -0,0 +1,117 @@
+import argparse
+import sqlite3
+
+# =========================
+# CONFIG
+# =========================
+DB_NAME = "knowledge_base.db"
+TABLE_NAME = "conversation_embeddings"
+
+# Batas hot tier (harus sama dengan HOT_PRIORITY di main_chatbot.py)
+HOT_PRIORITY = 1
+
+# =========================
+# SET PRIORITY
+# =========================
+# Mengubah priority chunk secara massal. Chunk dengan priority >= HOT_PRIORITY
+# masuk hot tier dan dicari lebih dulu.
+#
+# Contoh:
+#   python set_priority.py 10 --conv-id 11500 --conv-id 11501
+#   python set_priority.py 10 --chunk 11500:0 --contains "paket gold"
+#   python set_priority.py 10 --file chunk_terverifikasi.txt
+#   python set_priority.py 0 --all
+#
+# Format file: satu baris per conv_id atau conv_id:chunk_index.
+# Setelah mengubah priority, restart API (INDEX_MODE = "sqlite")
+# atau jalankan ulang build_index.py (INDEX_MODE = "shared").
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Set priority chunk secara massal")
+    parser.add_argument("priority", type=int, help="Nilai priority baru")
+    parser.add_argument("--conv-id", action="append", default=[], help="Semua chunk dari conv_id ini")
+    parser.add_argument("--chunk", action="append", default=[], help="Chunk tertentu, format conv_id:chunk_index")
+    parser.add_argument("--contains", action="append", default=[], help="Chunk yang teksnya memuat kata ini")
+    parser.add_argument("--file", help="File berisi conv_id atau conv_id:chunk_index per baris")
+    parser.add_argument("--all", action="store_true", help="Semua chunk")
+    parser.add_argument("--db", default=DB_NAME, help="Path database SQLite")
+    return parser.parse_args()
+
+def read_targets(path):
+    """Membaca daftar conv_id / conv_id:chunk_index dari file"""
+    conv_ids, chunks = [], []
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            (chunks if ":" in line else conv_ids).append(line)
+
+    return conv_ids, chunks
+
+def set_priority(args):
+    """Menjalankan UPDATE priority untuk semua selector yang diberikan"""
+    conv_ids = list(args.conv_id)
+    chunks = list(args.chunk)
+
+    if args.file:
+        file_conv_ids, file_chunks = read_targets(args.file)
+        conv_ids += file_conv_ids
+        chunks += file_chunks
+
+    conn = sqlite3.connect(args.db)
+    cursor = conn.cursor()
+    updated = 0
+
+    if args.all:
+        cursor.execute(f"UPDATE {TABLE_NAME} SET priority = ?", (args.priority,))
+        updated += cursor.rowcount
+
+    if conv_ids:
+        cursor.executemany(
+            f"UPDATE {TABLE_NAME} SET priority = ? WHERE conv_id = ?",
+            [(args.priority, conv_id) for conv_id in conv_ids]
+        )
+        updated += cursor.rowcount
+
+    if chunks:
+        pairs = []
+        for chunk in chunks:
+            conv_id, chunk_index = chunk.rsplit(":", 1)
+            pairs.append((args.priority, conv_id, int(chunk_index)))
+
+        cursor.executemany(
+            f"UPDATE {TABLE_NAME} SET priority = ? WHERE conv_id = ? AND chunk_index = ?",
+            pairs
+        )
+        updated += cursor.rowcount
+
+    for keyword in args.contains:
+        cursor.execute(
+            f"UPDATE {TABLE_NAME} SET priority = ? WHERE text LIKE ?",
+            (args.priority, f"%{keyword}%")
+        )
+        updated += cursor.rowcount
+
+    conn.commit()
+
+    cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE priority >= ?", (HOT_PRIORITY,))
+    hot_count = cursor.fetchone()[0]
+
+    conn.close()
+
+    print("Selesai.")
+    print(f"{updated} chunk diubah ke priority {args.priority}")
+    print(f"Jumlah chunk di hot tier (priority >= {HOT_PRIORITY}): {hot_count}")
+
+# =========================
+# RUN
+# =========================
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not (args.all or args.conv_id or args.chunk or args.contains or args.file):
+        print("Tidak ada chunk yang dipilih. Gunakan --conv-id, --chunk, --contains, --file, atau --all.")
+    else:
+        set_priority(args)
@@ -0,0 +1,83 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from resilience import Deadline, DeadlineExceeded
+
+# =========================
+# HELPERS
+# =========================
+def normalize_key(text: str) -> str:
+    """Normalisasi input agar pesan yang hanya beda spasi/huruf besar dianggap sama"""
+    return " ".join(text.casefold().split())
+
+# =========================
+# SINGLEFLIGHT
+# =========================
+class SingleFlight:
+    """Menggabungkan call identik yang sedang berjalan sehingga hanya satu yang dikirim ke upstream.
+
+    Call bersama dijalankan di thread pool dengan Deadline sendiri yang dimulai saat call
+    dibuat, tidak terikat ke request mana pun. Setiap pemanggil (termasuk yang pertama)
+    hanya menunggu sesuai sisa budget masing-masing.
+    """
+
+    def __init__(self, max_workers: int = 64):
+        self.lock = threading.Lock()
+        self.in_flight: dict[tuple, Future] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        # Statistik per jenis call: call ke upstream dan call yang ikut menunggu hasil
+        self.upstream_calls = defaultdict(int)
+        self.shared_calls = defaultdict(int)
+
+    def do(self, call_type: str, key, fn, budget: float, timeout: float = None):
+        """Menjalankan fn(deadline) sekali per (call_type, key); pemanggil lain menunggu hasil yang sama"""
+        flight_key = (call_type, key)
+
+        with self.lock:
+            future = self.in_flight.get(flight_key)
+            leader = future is None
+
+            if leader:
+                future = self.executor.submit(self.run, call_type, fn, Deadline(budget))
+                self.in_flight[flight_key] = future
+                self.upstream_calls[call_type] += 1
+            else:
+                self.shared_calls[call_type] += 1
+
+        # Callback didaftarkan di luar lock karena bisa langsung dijalankan jika fn sudah selesai
+        if leader:
+            future.add_done_callback(lambda done: self.forget(flight_key, done))
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Future yang sudah selesai berarti error berasal dari call bersama itu sendiri
+            if future.done():
+                raise
+            raise DeadlineExceeded(f"Timeout menunggu call {call_type} yang sedang berjalan")
+
+    def run(self, call_type: str, fn, deadline: Deadline):
+        """Menjalankan call bersama; call yang budget-nya habis selama antri tidak dikirim ke upstream"""
+        if deadline.remaining() <= 0:
+            raise DeadlineExceeded(f"Budget call {call_type} habis sebelum dijalankan")
+        return fn(deadline)
+
+    def forget(self, flight_key: tuple, future: Future):
+        """Menghapus call yang sudah selesai agar call berikutnya dikirim ulang ke upstream"""
+        with self.lock:
+            if self.in_flight.get(flight_key) is future:
+                del self.in_flight[flight_key]
+
+    def get_stats(self) -> dict:
+        """Jumlah call upstream dan call yang dihemat per jenis call"""
+        with self.lock:
+            call_types = set(self.upstream_calls) | set(self.shared_calls)
+            return {
+                call_type: {
+                    "upstream_calls": self.upstream_calls[call_type],
+                    "calls_saved": self.shared_calls[call_type]
+                }
+                for call_type in sorted(call_types)
+            }
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modul proyek berupa script di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main_chatbot.py membutuhkan API key saat import; test tidak memanggil API sungguhan
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
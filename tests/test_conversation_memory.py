@@ -0,0 +1,48 @@
+import main_chatbot
+from main_chatbot import ConversationMemory
+
+
+def add_turns(memory, count):
+    for i in range(count):
+        memory.add_exchange(f"tanya {i}", f"jawab {i}")
+
+
+def test_evicted_turns_stay_in_context_until_summarized():
+    memory = ConversationMemory("c1")
+    add_turns(memory, main_chatbot.HISTORY_WINDOW + 2)
+
+    summary, turns = memory.get_context()
+
+    assert summary == ""
+    assert [turn["user"] for turn in turns] == [f"tanya {i}" for i in range(main_chatbot.HISTORY_WINDOW + 2)]
+
+
+def test_summarized_turns_are_replaced_by_summary():
+    memory = ConversationMemory("c1")
+    add_turns(memory, main_chatbot.HISTORY_WINDOW + main_chatbot.SUMMARY_BATCH_SIZE)
+
+    batch = memory.take_pending_summary()
+    assert len(batch) == main_chatbot.SUMMARY_BATCH_SIZE
+
+    # Exchange baru yang tergusur selama ringkasan berjalan tetap menunggu
+    memory.add_exchange("tanya baru", "jawab baru")
+    memory.finish_summary(batch, "ringkasan")
+
+    summary, turns = memory.get_context()
+
+    assert summary == "ringkasan"
+    assert len(turns) == main_chatbot.HISTORY_WINDOW + 1
+    assert turns[0]["user"] == f"tanya {main_chatbot.SUMMARY_BATCH_SIZE}"
+    assert turns[-1]["user"] == "tanya baru"
+
+
+def test_failed_summary_keeps_turns_in_context():
+    memory = ConversationMemory("c1")
+    add_turns(memory, main_chatbot.HISTORY_WINDOW + main_chatbot.SUMMARY_BATCH_SIZE)
+
+    batch = memory.take_pending_summary()
+    memory.finish_summary(batch, None)
+
+    _, turns = memory.get_context()
+    assert len(turns) == main_chatbot.HISTORY_WINDOW + main_chatbot.SUMMARY_BATCH_SIZE
+    assert memory.take_pending_summary() == batch
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from main_chatbot import EmbeddingBatcher
+from resilience import Deadline, DeadlineExceeded
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+    release = threading.Event()
+
+    def embed_fn(texts):
+        release.wait(1)
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed_fn)
+    batcher.max_wait = 0.05
+
+    futures = [batcher.submit(text) for text in ["a", "bb", "ccc"]]
+    release.set()
+
+    assert [future.result(timeout=1) for future in futures] == [[1.0], [2.0], [3.0]]
+    assert calls == [["a", "bb", "ccc"]]
+    assert batcher.upstream_calls == 1
+    assert batcher.inputs == 3
+
+
+def test_error_is_delivered_to_every_caller():
+    def embed_fn(texts):
+        raise RuntimeError("upstream down")
+
+    batcher = EmbeddingBatcher(embed_fn)
+    futures = [batcher.submit(text) for text in ["a", "b"]]
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=1)
+
+
+def test_embed_respects_deadline():
+    release = threading.Event()
+
+    def embed_fn(texts):
+        release.wait(1)
+        return [[0.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed_fn)
+
+    with pytest.raises(DeadlineExceeded):
+        batcher.embed("a", Deadline(0.05))
+
+    release.set()
+
+
+def test_batch_timeout_error_is_not_relabelled_as_deadline():
+    def embed_fn(texts):
+        raise TimeoutError("upstream timeout")
+
+    batcher = EmbeddingBatcher(embed_fn)
+
+    with pytest.raises(TimeoutError) as error:
+        batcher.embed("a", Deadline(1))
+
+    assert not isinstance(error.value, DeadlineExceeded)
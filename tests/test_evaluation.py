@@ -0,0 +1,52 @@
+import numpy as np
+
+import evaluation
+from evaluation import mask_query_bubble, rank_with_masking
+from main_chatbot import EmbeddingService, build_vector_index, normalize_rows
+
+
+def test_mask_query_bubble_removes_only_matching_user_bubble():
+    chunk = "User:\nhalo\nkak\nAssistant:\nhai\nUser:\nhalo"
+
+    assert mask_query_bubble(chunk, "halo\nkak") == "Assistant:\nhai\nUser:\nhalo"
+    assert mask_query_bubble(chunk, "hai") == chunk
+
+
+def make_case(quantization, coarse_dimensions):
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((60, 32)).astype(np.float32)
+    entries = [{"id": i, "text": f"chunk {i}"} for i in range(len(matrix))]
+    queries = rng.standard_normal((5, 32)).astype(np.float32)
+
+    # Query i memiliki chunk i; versi tanpa bubble-nya identik dengan query
+    own_chunks = [{i: f"masked {i}"} for i in range(len(queries))]
+    masked_vectors = queries.copy()
+
+    service = EmbeddingService()
+    service.index = build_vector_index(entries, matrix, quantization, coarse_dimensions)
+    return service, queries, own_chunks, masked_vectors, matrix
+
+
+def test_exact_masking_matches_brute_force():
+    service, queries, own_chunks, masked_vectors, matrix = make_case("float32", 32)
+    rankings = rank_with_masking(service, service.index, queries, own_chunks, masked_vectors)
+
+    for row, ranking in enumerate(rankings):
+        vectors = normalize_rows(matrix)
+        vectors[row] = normalize_rows(masked_vectors[row:row + 1])[0]
+        expected = np.argsort(-(vectors @ normalize_rows(queries)[row]))[:evaluation.MRR_DEPTH]
+
+        assert [item["id"] for item, _ in ranking] == list(expected)
+        assert ranking[0][0]["id"] == row
+
+
+def test_masked_chunk_must_pass_the_same_first_pass():
+    service, queries, own_chunks, _, _ = make_case("float32", 1)
+
+    # Prefix 1 dimensi bernilai negatif: first-pass tidak memilih chunk ini walau skor penuhnya 1.0
+    masked_vectors = queries.copy()
+    masked_vectors[:, 0] = -np.abs(queries[:, 0]) * np.sign(queries[:, 0])
+    rankings = rank_with_masking(service, service.index, queries, own_chunks, masked_vectors)
+
+    for row, ranking in enumerate(rankings):
+        assert row not in [item["id"] for item, _ in ranking]
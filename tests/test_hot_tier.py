@@ -0,0 +1,50 @@
+import numpy as np
+
+import main_chatbot
+from main_chatbot import EmbeddingService, build_vector_index
+
+
+def make_service(hot_ids):
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((100, 32)).astype(np.float32)
+    entries = [
+        {"id": i, "text": f"chunk {i}", "priority": 5 if i in hot_ids else 0}
+        for i in range(len(matrix))
+    ]
+
+    service = EmbeddingService()
+    service.similarity_threshold = 0.5
+    service.index = build_vector_index(entries, matrix, "float32", matrix.shape[1])
+    return service, matrix
+
+
+def test_confident_hot_match_stops_in_hot_tier():
+    service, matrix = make_service(hot_ids={3, 7})
+
+    results, best = service.search_by_vector(matrix[3], top_k=3)
+
+    assert results[0][0]["id"] == 3
+    assert best >= service.similarity_threshold + main_chatbot.HOT_TIER_MARGIN
+    assert all(item["priority"] >= main_chatbot.HOT_PRIORITY for item, _ in results)
+    assert service.get_search_stats()["hot_hits"] == 1
+
+
+def test_weak_hot_match_falls_back_to_full_search():
+    service, matrix = make_service(hot_ids={3, 7})
+
+    results, _ = service.search_by_vector(matrix[50], top_k=3)
+
+    assert results[0][0]["id"] == 50
+    stats = service.get_search_stats()
+    assert stats["hot_hits"] == 0
+    assert stats["queries"] == 1
+
+
+def test_batch_mixes_hot_and_full_results():
+    service, matrix = make_service(hot_ids={3})
+
+    hot, full = service.search_by_vectors(matrix[[3, 60]], top_k=1)
+
+    assert hot[0][0][0]["id"] == 3
+    assert full[0][0][0]["id"] == 60
+    assert service.get_search_stats()["hot_hits"] == 1
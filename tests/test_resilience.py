@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+
+import resilience
+from resilience import (
+    CallTimeout,
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    DeadlineExceeded,
+    hedged_call,
+    resilient_call
+)
+
+
+def open_breaker(reset_timeout=0.05):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_allows_single_trial():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_half_open_trial_success_closes_breaker():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_half_open_trial_failure_reopens_breaker():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_spent_deadline_does_not_consume_half_open_trial():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    spent = Deadline(0)
+    with pytest.raises(DeadlineExceeded):
+        resilient_call(lambda timeout: "ok", spent, breaker, call_timeout=1)
+
+    # Request berikutnya dengan budget baru tetap boleh menjadi percobaan half-open
+    assert resilient_call(lambda timeout: "ok", Deadline(1), breaker, call_timeout=1) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_rejects_without_calling_upstream():
+    breaker = open_breaker(reset_timeout=60)
+    calls = []
+
+    with pytest.raises(CircuitOpenError):
+        resilient_call(lambda timeout: calls.append(timeout), Deadline(1), breaker, call_timeout=1)
+
+    assert calls == []
+
+
+def test_retryable_error_is_retried_within_budget():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=60)
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 2:
+            raise CallTimeout("timeout")
+        return "ok"
+
+    assert resilient_call(flaky, Deadline(5), breaker, call_timeout=1, retries=2) == "ok"
+    assert len(attempts) == 2
+    assert breaker.state == "closed"
+
+
+def test_non_retryable_error_is_not_counted_as_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+
+    def bad_request(timeout):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        resilient_call(bad_request, Deadline(1), breaker, call_timeout=1)
+
+    assert breaker.state == "closed"
+
+
+def test_hedge_returns_fastest_result():
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    start = time.monotonic()
+    assert hedged_call(fn, timeout=2, hedge_delay=0.05) == "fast"
+    assert time.monotonic() - start < 0.4
+    assert len(calls) == 2
+
+
+def test_hedge_wait_is_bounded_by_timeout():
+    def fn(timeout):
+        time.sleep(0.5)
+        return "late"
+
+    start = time.monotonic()
+    with pytest.raises(CallTimeout):
+        hedged_call(fn, timeout=0.1, hedge_delay=0.05)
+    assert time.monotonic() - start < 0.3
+
+
+def test_hedge_timeout_surfaces_as_resilience_error():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=60)
+
+    def hanging(timeout):
+        time.sleep(0.3)
+        return "late"
+
+    # generate_response hanya menangkap OpenAIError dan ResilienceError
+    with pytest.raises(resilience.ResilienceError):
+        resilient_call(hanging, Deadline(5), breaker, call_timeout=0.1, retries=0, hedge_delay=0.05)
+
+
+def test_saturated_pool_runs_call_without_hedge():
+    release = threading.Event()
+    blockers = []
+
+    # Isi semua slot yang masih kosong (sebagian mungkin masih dipakai test sebelumnya)
+    while True:
+        future = resilience.submit_hedge(lambda timeout: release.wait(timeout), time.monotonic() + 2)
+        if future is None:
+            break
+        blockers.append(future)
+    calls = []
+
+    def fn(timeout):
+        calls.append(threading.current_thread())
+        time.sleep(0.1)
+        return "ok"
+
+    try:
+        assert hedged_call(fn, timeout=1, hedge_delay=0.01) == "ok"
+        assert calls == [threading.current_thread()]
+    finally:
+        release.set()
+        for future in blockers:
+            future.result(timeout=1)
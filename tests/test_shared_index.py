@@ -0,0 +1,81 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+import main_chatbot
+from main_chatbot import TABLE_NAME, EmbeddingService
+
+
+def make_database(path, rows=40, dimensions=main_chatbot.EMBEDDING_DIMENSIONS):
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((rows, dimensions)).astype(np.float32)
+
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE {TABLE_NAME} (id INTEGER PRIMARY KEY, text TEXT, vector TEXT, priority INTEGER)")
+    conn.executemany(
+        f"INSERT INTO {TABLE_NAME} (id, text, vector, priority) VALUES (?, ?, ?, 0)",
+        [(i + 1, f"chunk {i}", json.dumps(vector.tolist())) for i, vector in enumerate(matrix)]
+    )
+    conn.commit()
+    conn.close()
+    return matrix
+
+
+def test_float32_generation_stores_matrix_once(tmp_path):
+    db_path = str(tmp_path / "kb.db")
+    index_dir = str(tmp_path / "index")
+    matrix = make_database(db_path)
+
+    service = EmbeddingService()
+    generation = service.publish_index(db_path, TABLE_NAME, index_dir, quantization="float32")
+    files = os.listdir(main_chatbot.generation_dir(index_dir, generation))
+
+    assert "matrix.npy" in files
+    assert "full_matrix.npy" not in files
+
+    worker = EmbeddingService()
+    worker.attach_index(index_dir)
+    worker.similarity_threshold = -1.0
+
+    assert worker.index.full_matrix is worker.index.matrix
+    assert worker.search_by_vector(matrix[5], top_k=1)[0][0][0]["id"] == 6
+
+
+def test_int8_generation_keeps_full_matrix_for_rerank(tmp_path):
+    db_path = str(tmp_path / "kb.db")
+    index_dir = str(tmp_path / "index")
+    matrix = make_database(db_path)
+
+    service = EmbeddingService()
+    generation = service.publish_index(db_path, TABLE_NAME, index_dir, quantization="int8")
+    assert "full_matrix.npy" in os.listdir(main_chatbot.generation_dir(index_dir, generation))
+
+    worker = EmbeddingService()
+    worker.attach_index(index_dir)
+    worker.similarity_threshold = -1.0
+
+    assert worker.index.needs_rerank
+    assert worker.search_by_vector(matrix[5], top_k=1)[0][0][0]["id"] == 6
+
+
+def test_failed_reload_keeps_current_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(main_chatbot, "INDEX_REFRESH_INTERVAL", 0)
+
+    db_path = str(tmp_path / "kb.db")
+    index_dir = str(tmp_path / "index")
+    matrix = make_database(db_path)
+
+    service = EmbeddingService()
+    service.publish_index(db_path, TABLE_NAME, index_dir)
+    service.attach_index(index_dir)
+    service.similarity_threshold = -1.0
+
+    # CURRENT menunjuk generation yang sudah dihapus
+    with open(os.path.join(index_dir, "CURRENT"), "w", encoding="utf-8") as f:
+        f.write("99")
+
+    results, _ = service.search_by_vector(matrix[0], top_k=1)
+    assert results[0][0]["id"] == 1
+    assert service.index.generation == 1
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+
+from resilience import DeadlineExceeded
+from singleflight import SingleFlight, normalize_key
+
+
+def test_normalize_key_ignores_case_and_whitespace():
+    assert normalize_key("  Halo   KAK\n") == normalize_key("halo kak")
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fn(deadline):
+        calls.append(1)
+        release.wait(1)
+        return "hasil"
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("embedding", "halo", fn, 5, timeout=2)))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["hasil"] * 10
+    assert len(calls) == 1
+    assert flight.get_stats() == {"embedding": {"upstream_calls": 1, "calls_saved": 9}}
+    assert flight.in_flight == {}
+
+
+def test_error_is_shared_and_next_call_goes_upstream():
+    flight = SingleFlight()
+    calls = []
+
+    def failing(deadline):
+        calls.append(1)
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def run():
+        try:
+            flight.do("analyze", "halo", failing, 5, timeout=1)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 5
+    assert len(calls) == 1
+    assert flight.do("analyze", "halo", lambda deadline: "ok", 5, timeout=1) == "ok"
+
+
+def test_leader_budget_does_not_fail_followers():
+    flight = SingleFlight()
+
+    def slow(deadline):
+        time.sleep(0.3)
+        return "hasil"
+
+    # Pemanggil pertama hampir kehabisan budget, pemanggil kedua masih punya banyak
+    leader_error = []
+
+    def leader():
+        try:
+            flight.do("embedding", "halo", slow, 5, timeout=0.05)
+        except DeadlineExceeded as e:
+            leader_error.append(e)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    time.sleep(0.01)
+
+    assert flight.do("embedding", "halo", slow, 5, timeout=2) == "hasil"
+    thread.join()
+    assert len(leader_error) == 1
+
+
+def test_follower_timeout_raises_deadline_exceeded():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def slow(deadline):
+        release.wait(1)
+        return "hasil"
+
+    thread = threading.Thread(target=lambda: flight.do("analyze", "halo", slow, 5, timeout=2))
+    thread.start()
+    time.sleep(0.01)
+
+    with pytest.raises(DeadlineExceeded):
+        flight.do("analyze", "halo", slow, 5, timeout=0.05)
+
+    release.set()
+    thread.join()
+
+
+def test_upstream_timeout_is_not_relabelled_as_wait_timeout():
+    flight = SingleFlight()
+
+    def timing_out(deadline):
+        raise TimeoutError("upstream timeout")
+
+    # Error yang dilempar call bersama diteruskan apa adanya, bukan DeadlineExceeded
+    with pytest.raises(TimeoutError) as error:
+        flight.do("embedding", "halo", timing_out, 5, timeout=1)
+
+    assert not isinstance(error.value, DeadlineExceeded)
+    assert str(error.value) == "upstream timeout"
+
+
+def test_flight_expired_in_queue_is_not_sent_upstream():
+    flight = SingleFlight(max_workers=1)
+    release = threading.Event()
+    calls = []
+
+    def blocker(deadline):
+        release.wait(1)
+
+    def upstream(deadline):
+        calls.append(deadline.remaining())
+        return "hasil"
+
+    threading.Thread(target=lambda: flight.do("embedding", "blocker", blocker, 5, timeout=2)).start()
+    time.sleep(0.01)
+
+    # Pool penuh: flight ini antri lebih lama dari budget-nya, dan pemanggilnya sudah menyerah
+    with pytest.raises(DeadlineExceeded):
+        flight.do("embedding", "halo", upstream, 0.05, timeout=0.02)
+
+    time.sleep(0.1)
+    release.set()
+    time.sleep(0.05)
+
+    assert calls == []
+    assert flight.in_flight == {}
+
+
+def test_flight_deadline_starts_at_submission():
+    flight = SingleFlight()
+    budgets = []
+
+    def fn(deadline):
+        budgets.append(deadline.remaining())
+        return "hasil"
+
+    assert flight.do("analyze", "halo", fn, 2, timeout=1) == "hasil"
+    assert 0 < budgets[0] <= 2
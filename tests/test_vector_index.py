@@ -0,0 +1,110 @@
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+import main_chatbot
+from main_chatbot import EmbeddingService, build_vector_index, normalize_rows, quantize_matrix, score_matrix
+
+
+def random_matrix(rows=300, dimensions=64, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((rows, dimensions)).astype(np.float32)
+
+
+def make_entries(rows):
+    return [{"id": i + 1, "text": f"chunk {i}", "priority": 0} for i in range(rows)]
+
+
+def make_service(entries, matrix, quantization, coarse_dimensions=None, keep_full=True):
+    service = EmbeddingService()
+    service.batcher = None
+    service.similarity_threshold = -1.0
+    service.index = build_vector_index(
+        entries, matrix, quantization, coarse_dimensions or matrix.shape[1], keep_full=keep_full
+    )
+    return service
+
+
+def test_int8_scores_match_exact_scores():
+    matrix = normalize_rows(random_matrix())
+    queries = normalize_rows(random_matrix(rows=5, seed=1))
+
+    quantized, scales = quantize_matrix(matrix, "int8")
+    assert quantized.dtype == np.int8
+    assert scales.shape == (matrix.shape[1],)
+
+    # Skala per dimensi: q * scale harus merekonstruksi matriks asli
+    np.testing.assert_allclose(quantized * scales, matrix, atol=scales.max())
+
+    exact = matrix @ queries.T
+    approx = score_matrix(quantized, scales, queries)
+    np.testing.assert_allclose(approx, exact, atol=0.02)
+
+
+def test_float16_blockwise_scores_match_exact_scores(monkeypatch):
+    monkeypatch.setattr(main_chatbot, "SCORE_BLOCK_SIZE", 7)
+
+    matrix = normalize_rows(random_matrix())
+    query = normalize_rows(random_matrix(rows=1, seed=2))[0]
+
+    compact, scales = quantize_matrix(matrix, "float16")
+    assert scales is None
+
+    scores = score_matrix(compact, scales, query)
+    assert scores.shape == (matrix.shape[0],)
+    np.testing.assert_allclose(scores, matrix @ query, atol=1e-3)
+
+
+@pytest.mark.parametrize("quantization, coarse_dimensions", [("int8", None), ("float16", None), ("int8", 32)])
+def test_compact_search_ranks_like_exact_search(quantization, coarse_dimensions):
+    # Varians menurun per dimensi seperti embedding Matryoshka, sehingga prefix tetap informatif
+    matrix = random_matrix() * np.exp(-np.arange(64) / 16).astype(np.float32)
+    entries = make_entries(len(matrix))
+    queries = matrix[:20] + 0.1 * random_matrix(rows=20, seed=3) * matrix.std(axis=0)
+
+    exact = make_service(entries, matrix, "float32")
+    compact = make_service(entries, matrix, quantization, coarse_dimensions)
+    assert compact.index.needs_rerank
+
+    for query in queries:
+        expected, _ = exact.search_by_vector(query, top_k=3)
+        results, _ = compact.search_by_vector(query, top_k=3)
+
+        assert [item["id"] for item, _ in results] == [item["id"] for item, _ in expected]
+        np.testing.assert_allclose(
+            [score for _, score in results], [score for _, score in expected], atol=1e-5
+        )
+
+
+def test_rerank_reads_full_vectors_from_database(tmp_path):
+    matrix = random_matrix(rows=50)
+    entries = make_entries(len(matrix))
+
+    db_path = str(tmp_path / "index.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE chunks (id INTEGER PRIMARY KEY, vector TEXT)")
+    conn.executemany(
+        "INSERT INTO chunks (id, vector) VALUES (?, ?)",
+        [(entry["id"], json.dumps(vector.tolist())) for entry, vector in zip(entries, matrix)]
+    )
+    conn.commit()
+    conn.close()
+
+    service = make_service(entries, matrix, "int8", keep_full=False)
+    service.db_path = db_path
+    service.table_name = "chunks"
+    assert service.index.full_matrix is None
+
+    # Indeks duplikat dan urutan acak tetap dikembalikan sesuai bentuk input
+    indices = np.array([[3, 1, 3], [49, 0, 1]])
+    vectors = service.fetch_full_vectors(service.index, indices)
+
+    assert vectors.shape == (2, 3, matrix.shape[1])
+    np.testing.assert_allclose(vectors, normalize_rows(matrix)[indices], atol=1e-6)
+
+    exact = make_service(entries, matrix, "float32")
+    query = matrix[7]
+    assert [item["id"] for item, _ in service.search_by_vector(query, top_k=3)[0]] == \
+        [item["id"] for item, _ in exact.search_by_vector(query, top_k=3)[0]]